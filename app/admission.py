@@ -0,0 +1,217 @@
+"""Admission control at the API edge: per route class limits, queues, deadlines
+
+Requests are sorted into classes (cheap reads, writes, heavy endpoints
+like search / stats / export / bulk). Each class has its own adaptive
+concurrency limit (AIMD on the upstream latency its requests see), a
+bounded FIFO queue and a queue deadline. Classes are served in priority
+order: a lower class is not admitted while a higher one has requests
+waiting, so a burst of searches cannot push out GET /profiles/{id}.
+Requests that would wait too long get 503 + Retry-After straight away.
+"""
+import asyncio
+import json
+import math
+import re
+import time
+from collections import deque
+from typing import Optional
+from app import metrics
+from app.resilience import AIMDLimit
+
+# First match wins; paths outside these (/, /health, /metrics, docs) are not limited
+ROUTE_CLASSES = (
+    ("heavy", None, re.compile(r"/profiles/(search/?|stats/roles|export|bulk|batch-get)$")),
+    ("write", ("POST", "PUT", "PATCH", "DELETE"), re.compile(r"/profiles(/|$)")),
+    ("read", ("GET", "HEAD"), re.compile(r"/profiles(/|$)")),
+)
+
+# Highest priority first
+PRIORITY = ("read", "write", "heavy")
+
+admission_rejected = metrics.registry.counter(
+    "admission_rejected_total", "Requests refused at the API edge", ("route_class", "reason")
+)
+admission_wait = metrics.registry.histogram(
+    "admission_queue_seconds", "Time spent queued before admission", ("route_class",)
+)
+
+
+def classify(method: str, path: str) -> Optional[str]:
+    for name, methods, pattern in ROUTE_CLASSES:
+        if (methods is None or method in methods) and pattern.search(path):
+            return name
+    return None
+
+
+class RouteClass:
+    """Limit + queue for one class of routes"""
+
+    def __init__(
+        self,
+        name: str,
+        limit: float,
+        min_limit: float,
+        max_limit: float,
+        queue: int,
+        timeout: float,
+        target_ms: float
+    ):
+        self.name = name
+        self.limit = AIMDLimit(limit, min_limit, max_limit, target_ms / 1000)
+        self.max_queue = int(queue)
+        self.timeout = timeout
+        self.in_flight = 0
+        self.waiters: deque = deque()
+        self.admitted = 0
+        self.rejected = 0
+
+    @property
+    def retry_after(self) -> int:
+        return max(1, math.ceil(self.timeout))
+
+    def stats(self) -> dict:
+        return {
+            "limit": self.limit.limit,
+            "in_flight": self.in_flight,
+            "queued": len(self.waiters),
+            "admitted": self.admitted,
+            "rejected": self.rejected
+        }
+
+
+class AdmissionController:
+    """Priority admission across route classes (single event loop)"""
+
+    def __init__(self, classes: dict):
+        self.classes = {
+            name: RouteClass(name, **classes[name]) for name in PRIORITY if name in classes
+        }
+
+    def _can_admit(self, route_class: RouteClass) -> bool:
+        if route_class.in_flight >= route_class.limit.limit:
+            return False
+        for name in PRIORITY:
+            if name == route_class.name:
+                return True
+            higher = self.classes.get(name)
+            if higher is not None and higher.waiters:
+                return False
+        return True
+
+    async def acquire(self, route_class: RouteClass) -> Optional[str]:
+        """None once admitted, else the reason for refusing"""
+        if not route_class.waiters and self._can_admit(route_class):
+            route_class.in_flight += 1
+            route_class.admitted += 1
+            return None
+        if len(route_class.waiters) >= route_class.max_queue:
+            return "queue_full"
+
+        loop = asyncio.get_running_loop()
+        waiter = loop.create_future()
+        route_class.waiters.append(waiter)
+        timer = loop.call_later(route_class.timeout, self._expire, route_class, waiter)
+        started = time.perf_counter()
+        try:
+            admitted = await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled() and waiter.result():
+                # Slot granted just before the cancel landed - hand it on
+                self.release(route_class)
+            else:
+                self._discard(route_class, waiter)
+            raise
+        finally:
+            timer.cancel()
+        admission_wait.observe(time.perf_counter() - started, route_class.name)
+        if not admitted:
+            return "deadline"
+        route_class.admitted += 1
+        return None
+
+    def release(self, route_class: RouteClass):
+        route_class.in_flight -= 1
+        self._wake()
+
+    def _expire(self, route_class: RouteClass, waiter: asyncio.Future):
+        if not waiter.done():
+            waiter.set_result(False)
+            self._discard(route_class, waiter)
+
+    def _discard(self, route_class: RouteClass, waiter: asyncio.Future):
+        try:
+            route_class.waiters.remove(waiter)
+        except ValueError:
+            pass
+        # A higher class emptying its queue can unblock lower ones
+        self._wake()
+
+    def _wake(self):
+        for name in PRIORITY:
+            route_class = self.classes.get(name)
+            if route_class is None:
+                continue
+            while route_class.waiters and self._can_admit(route_class):
+                waiter = route_class.waiters.popleft()
+                route_class.in_flight += 1
+                waiter.set_result(True)
+
+    def stats(self) -> dict:
+        return {name: route_class.stats() for name, route_class in self.classes.items()}
+
+
+# ============ MIDDLEWARE ============
+class AdmissionMiddleware:
+    """ASGI middleware: admit, queue or shed each request by route class"""
+
+    def __init__(self, app, controller: AdmissionController):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        name = classify(scope["method"], scope["path"])
+        route_class = self.controller.classes.get(name)
+        if route_class is None:
+            await self.app(scope, receive, send)
+            return
+
+        reason = await self.controller.acquire(route_class)
+        if reason is not None:
+            route_class.rejected += 1
+            admission_rejected.inc(route_class.name, reason)
+            await self._reject(send, route_class, reason)
+            return
+
+        started = time.monotonic()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        # Upstream latency per call is the signal the limit adapts to
+        with metrics.request_timings() as timings:
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                latency = timings.upstream / len(timings.calls) if timings.calls else 0.0
+                route_class.limit.sample(started, latency, route_class.in_flight, overloaded=status == 503)
+                self.controller.release(route_class)
+
+    async def _reject(self, send, route_class: RouteClass, reason: str):
+        body = json.dumps({"detail": f"Server busy ({route_class.name} requests: {reason})"}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(route_class.retry_after).encode())
+            ]
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,277 @@
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+from app.config import get_settings
+
+
+class LRUCache:
+    """Bounded in-process LRU cache with per-entry TTL
+
+    Expired entries are kept for another `stale_ttl` seconds and only
+    returned to get(..., allow_stale=True) - the upstream-down fallback.
+    """
+
+    def __init__(self, max_size: int = 10000, ttl: float = 60.0, stale_ttl: float = 0.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._data: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str, default: Any = None, allow_stale: bool = False) -> Any:
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+
+        expires_at, value = entry
+        now = time.monotonic()
+        if expires_at < now:
+            if expires_at + self.stale_ttl < now:
+                del self._data[key]
+                self.expirations += 1
+            elif allow_stale:
+                self.stale_hits += 1
+                return value
+            self.misses += 1
+            return default
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+
+        # Sabse purana entry hatao
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def delete(self, key: str):
+        self._data.pop(key, None)
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "stale_hits": self.stale_hits,
+            "evictions": self.evictions,
+            "expirations": self.expirations
+        }
+
+
+# ============ BACKENDS ============
+class CacheBackend:
+    """Async cache interface - in-process or shared between workers"""
+
+    async def get(self, key: str, allow_stale: bool = False) -> Optional[dict]:
+        raise NotImplementedError
+
+    async def set(self, key: str, value: dict, ttl: Optional[float] = None):
+        raise NotImplementedError
+
+    async def delete(self, *keys: str):
+        raise NotImplementedError
+
+    def stats(self) -> dict:
+        raise NotImplementedError
+
+
+class MemoryBackend(CacheBackend):
+    """Per-worker LRU backend (default)"""
+
+    def __init__(self, max_size: int = 10000, ttl: float = 60.0, stale_ttl: float = 0.0):
+        self.lru = LRUCache(max_size, ttl, stale_ttl)
+
+    async def get(self, key: str, allow_stale: bool = False) -> Optional[dict]:
+        value = self.lru.get(key, allow_stale=allow_stale)
+        return dict(value) if value is not None else None
+
+    async def set(self, key: str, value: dict, ttl: Optional[float] = None):
+        self.lru.set(key, dict(value), ttl)
+
+    async def delete(self, *keys: str):
+        for key in keys:
+            self.lru.delete(key)
+
+    def stats(self) -> dict:
+        return {"backend": "memory", **self.lru.stats()}
+
+
+class InMemoryStore:
+    """Redis-like key/value stand-in (get / set with ex / delete) for tests"""
+
+    def __init__(self):
+        self._data: dict = {}
+
+    async def get(self, key: str) -> Optional[bytes]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at is not None and expires_at < time.monotonic():
+            del self._data[key]
+            return None
+        return value
+
+    async def set(self, key: str, value: bytes, ex: Optional[float] = None):
+        expires_at = time.monotonic() + ex if ex else None
+        self._data[key] = (expires_at, value)
+
+    async def delete(self, *keys: str):
+        for key in keys:
+            self._data.pop(key, None)
+
+
+class SharedBackend(CacheBackend):
+    """Backend over a Redis-like store so all uvicorn workers see one cache
+
+    Eviction is left to the store (e.g. redis maxmemory-policy allkeys-lru).
+    The store drops keys at their TTL, so there are no stale reads.
+    """
+
+    def __init__(self, store: Any, ttl: float = 60.0, prefix: str = "profile-api:"):
+        self.store = store
+        self.ttl = ttl
+        self.prefix = prefix
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, key: str, allow_stale: bool = False) -> Optional[dict]:
+        raw = await self.store.get(self.prefix + key)
+        if raw is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(raw)
+
+    async def set(self, key: str, value: dict, ttl: Optional[float] = None):
+        ttl = self.ttl if ttl is None else ttl
+        await self.store.set(self.prefix + key, json.dumps(value, default=str), ex=max(1, int(ttl)))
+
+    async def delete(self, *keys: str):
+        if keys:
+            await self.store.delete(*[self.prefix + key for key in keys])
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "backend": "shared",
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": None
+        }
+
+
+# ============ PROFILE CACHE ============
+class ProfileCache:
+    """Profile rows cached by id and by email
+
+    Writes (put / invalidate) are numbered. A read-through fill() carries
+    the number from when its read started and is dropped if the row was
+    written since - a slow miss must not put the pre-write row back over
+    the write-through entry.
+    """
+
+    def __init__(self, backend: CacheBackend):
+        self.backend = backend
+        self._seq = 0
+        # id / email -> number of the last write (evicted = treated as long ago)
+        self._written = LRUCache(max_size=100000, ttl=300.0)
+
+    @staticmethod
+    def _id_key(profile_id: Any) -> str:
+        return f"profile:id:{profile_id}"
+
+    @staticmethod
+    def _email_key(email: str) -> str:
+        return f"profile:email:{email.lower()}"
+
+    async def get_by_id(self, profile_id: Any, allow_stale: bool = False) -> Optional[dict]:
+        return await self.backend.get(self._id_key(profile_id), allow_stale)
+
+    async def get_by_email(self, email: str, allow_stale: bool = False) -> Optional[dict]:
+        return await self.backend.get(self._email_key(email), allow_stale)
+
+    def _mark_written(self, *keys: str):
+        self._seq += 1
+        for key in keys:
+            self._written.set(key, self._seq)
+
+    def read_started(self) -> int:
+        """Token for fill() - take it before the database read"""
+        return self._seq
+
+    def _keys(self, profile: dict) -> list:
+        keys = [self._id_key(profile["id"])]
+        if profile.get("email"):
+            keys.append(self._email_key(profile["email"]))
+        return keys
+
+    async def _store(self, keys: list, profile: dict):
+        for key in keys:
+            await self.backend.set(key, profile)
+
+    async def put(self, profile: dict):
+        """Store (or refresh) a full profile row under both keys (write-through)"""
+        keys = self._keys(profile)
+        self._mark_written(*keys)
+        await self._store(keys, profile)
+
+    async def fill(self, profile: dict, started: int):
+        """Read-through store, skipped if the row was written after `started`"""
+        keys = self._keys(profile)
+        if any(self._written.get(key, 0) > started for key in keys):
+            return
+        await self._store(keys, profile)
+
+    async def invalidate(self, profile_id: Any, email: Optional[str] = None):
+        """Drop a profile; email is looked up from the cached row if not given"""
+        if email is None:
+            cached = await self.get_by_id(profile_id, allow_stale=True)
+            email = cached.get("email") if cached else None
+        keys = [self._id_key(profile_id)]
+        if email:
+            keys.append(self._email_key(email))
+        self._mark_written(*keys)
+        await self.backend.delete(*keys)
+
+    def stats(self) -> dict:
+        return self.backend.stats()
+
+
+def build_profile_cache() -> Optional[ProfileCache]:
+    """Create the profile cache from Settings (None if disabled)"""
+    settings = get_settings()
+    if not settings.profile_cache_enabled:
+        return None
+
+    if settings.profile_cache_backend == "redis":
+        try:
+            from redis import asyncio as redis_asyncio
+        except ImportError:
+            raise RuntimeError("profile_cache_backend='redis' needs the 'redis' package installed")
+        store = redis_asyncio.from_url(settings.redis_url)
+        return ProfileCache(SharedBackend(store, ttl=settings.profile_cache_ttl))
+
+    stale_ttl = settings.profile_cache_stale_ttl if settings.stale_on_error else 0.0
+    return ProfileCache(MemoryBackend(settings.profile_cache_max_size, settings.profile_cache_ttl, stale_ttl))
@@ -1,13 +1,123 @@
 from pydantic_settings import BaseSettings
 from functools import lru_cache
+from typing import Literal
+from app.models import CountStrategy
 
 class Settings(BaseSettings):
     supabase_url: str
     supabase_key: str
-    
+
+    # HTTP connection pool (Supabase REST)
+    db_max_connections: int = 100
+    db_max_keepalive_connections: int = 20
+    db_keepalive_expiry: float = 30.0
+    db_http2: bool = False
+
+    # Timeouts (seconds)
+    db_connect_timeout: float = 5.0
+    db_read_timeout: float = 30.0
+    db_write_timeout: float = 30.0
+    db_pool_timeout: float = 10.0
+
+    # Identical concurrent GETs share one upstream request
+    db_coalesce_reads: bool = True
+
+    # Resilience: GET retries (jittered backoff), circuit breaker and
+    # in-flight limit on upstream calls
+    db_retry_attempts: int = 2  # retries after the first try
+    db_retry_base_delay: float = 0.05
+    db_retry_max_delay: float = 1.0
+    db_max_concurrency: int = 100
+    db_queue_timeout: float = 2.0  # wait for a free slot before 503
+    circuit_failure_threshold: int = 5  # consecutive failures to open
+    circuit_reset_timeout: float = 10.0  # open -> half-open probe
+
+    # Serve expired cached profiles while Supabase is unavailable
+    stale_on_error: bool = True
+    profile_cache_stale_ttl: float = 300.0  # kept this long past the TTL
+
+    # Profile cache
+    profile_cache_enabled: bool = True
+    profile_cache_backend: str = "memory"  # memory | redis
+    profile_cache_max_size: int = 10000
+    profile_cache_ttl: float = 60.0
+    redis_url: str = "redis://localhost:6379/0"
+
+    # Count strategy per endpoint: exact | planned | estimated | none
+    count_strategy_profiles: CountStrategy = CountStrategy.EXACT
+    count_strategy_users: CountStrategy = CountStrategy.EXACT
+    count_strategy_institutions: CountStrategy = CountStrategy.EXACT
+    # Stats fallback needs a number - none is rejected
+    count_strategy_stats: Literal[CountStrategy.EXACT, CountStrategy.PLANNED, CountStrategy.ESTIMATED] = CountStrategy.EXACT
+    count_cache_ttl: float = 30.0
+
+    # Batch get-by-ids: ids per in.(...) request (~37 URL chars each)
+    batch_get_chunk_size: int = 100
+
+    # Search backend: ilike | fts (needs sql/search_profiles.sql)
+    search_mode: Literal["ilike", "fts"] = "ilike"
+
+    # In-memory autocomplete index (~600 MB per 1M profiles, built at startup)
+    autocomplete_enabled: bool = False
+
+    # Bulk import / export
+    bulk_batch_size: int = 500
+    export_page_size: int = 1000
+
+    # Write-behind for PUT /profiles/{id}: patches merged per profile and
+    # flushed in batches (sql/apply_profile_patches.sql, else one PATCH each)
+    write_behind_enabled: bool = False
+    write_behind_window: float = 0.5  # seconds
+    write_behind_max_pending: int = 1000  # profiles waiting before backpressure
+    write_behind_batch_size: int = 200
+
+    # Serialize responses once, skipping response_model re-validation
+    # (uses orjson when installed)
+    fast_json: bool = False
+
+    # Instrumentation: /metrics, Server-Timing header, slow request log
+    metrics_enabled: bool = True
+    server_timing_enabled: bool = True
+    slow_request_log_ms: float = 500.0
+
+    # Admission control at the API edge, per route class (read / write /
+    # heavy = search, stats, export, bulk, batch-get): starting, min and max
+    # concurrency (AIMD on upstream latency vs target_ms), queue length and
+    # queue deadline (seconds) before 503 + Retry-After
+    admission_enabled: bool = False
+    admission_classes: dict[str, dict[str, float]] = {
+        "read": {"limit": 64, "min_limit": 8, "max_limit": 256, "queue": 256, "timeout": 1.0, "target_ms": 50},
+        "write": {"limit": 32, "min_limit": 4, "max_limit": 128, "queue": 128, "timeout": 2.0, "target_ms": 100},
+        "heavy": {"limit": 8, "min_limit": 1, "max_limit": 32, "queue": 8, "timeout": 0.25, "target_ms": 250}
+    }
+
+    # Cache-Control per route group
+    cache_control: dict[str, str] = {
+        "profile": "private, no-cache",
+        "list": "private, no-cache",
+        "stats": "private, max-age=30"
+    }
+
+    # Role stats background reconcile (seconds)
+    stats_reconcile_interval: float = 300.0
+
+    # Change feed: poll profiles changed by other workers / straight in
+    # Supabase and apply them to this worker's cache, stats and autocomplete
+    # index (sql/profile_changes.sql). With it on, profile_cache_ttl can be
+    # raised well past the poll interval.
+    change_feed_enabled: bool = False
+    change_feed_interval: float = 1.0  # seconds between polls once caught up
+    change_feed_batch_size: int = 500
+    change_feed_settle: float = 2.0  # younger rows wait (late-committing transactions)
+    change_feed_deletions_table: str = ""  # "profile_deletions" once the SQL is applied
+    # JSON file per worker (<path>.<worker id>); empty = in memory. Worker
+    # id defaults to the pid - set a stable one to resume after restarts.
+    change_feed_checkpoint_path: str = ""
+    change_feed_worker_id: str = ""
+
     class Config:
         env_file = ".env"
 
 @lru_cache()
 def get_settings():
-    return Settings()
\ No newline at end of file
+    return Settings()
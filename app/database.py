@@ -1,8 +1,100 @@
+import asyncio
 import httpx
-from typing import Optional, Any
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from functools import lru_cache
+from typing import Optional, Any, AsyncIterator, Iterator
+from app import metrics
 from app.config import get_settings
+from app.filters import Condition, Predicate, literal, tree
+from app.json_stream import aiter_json_array, iter_json_array
+from app.resilience import CircuitBreaker, ConcurrencyLimiter, RetryPolicy
+from app.singleflight import SingleFlight
 
-settings = get_settings()
+
+# ============ ERRORS ============
+class DatabaseError(Exception):
+    """PostgREST / Supabase error"""
+    
+    def __init__(
+        self,
+        status_code: int,
+        message: str,
+        code: Optional[str] = None,
+        details: Optional[str] = None,
+        hint: Optional[str] = None
+    ):
+        super().__init__(f"Database error: {status_code} - {message}")
+        self.status_code = status_code
+        self.message = message
+        self.code = code
+        self.details = details
+        self.hint = hint
+
+
+class NotFoundError(DatabaseError):
+    """404 - table / function / row missing"""
+
+
+class ConflictError(DatabaseError):
+    """409 - constraint conflict"""
+
+
+class UniqueViolationError(ConflictError):
+    """Unique constraint violated (Postgres 23505)"""
+
+
+class UpstreamUnavailableError(DatabaseError):
+    """Supabase down, 5xx or network failure"""
+    
+    def __init__(self, *args, retry_after: Optional[float] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.retry_after = retry_after  # seconds, sent back as Retry-After
+
+
+class LoadShedError(UpstreamUnavailableError):
+    """Call refused before reaching Supabase (too many in flight)"""
+
+
+class CircuitOpenError(LoadShedError):
+    """Circuit breaker open - Supabase is failing, calls are shed"""
+
+
+def error_from_response(response: httpx.Response) -> DatabaseError:
+    """Map a PostgREST error response to a typed DatabaseError"""
+    try:
+        body = response.json()
+    except ValueError:
+        body = None
+    if not isinstance(body, dict):
+        body = {"message": response.text}
+    
+    kwargs = {
+        "status_code": response.status_code,
+        "message": body.get("message") or response.text,
+        "code": body.get("code"),
+        "details": body.get("details"),
+        "hint": body.get("hint")
+    }
+    
+    if kwargs["code"] == "23505":
+        return UniqueViolationError(**kwargs)
+    if response.status_code == 409:
+        return ConflictError(**kwargs)
+    if response.status_code == 404:
+        return NotFoundError(**kwargs)
+    if response.status_code >= 500:
+        return UpstreamUnavailableError(**kwargs, retry_after=retry_after_of(response))
+    return DatabaseError(**kwargs)
+
+
+def retry_after_of(response: httpx.Response) -> Optional[float]:
+    """Retry-After header in seconds (HTTP-date form is ignored)"""
+    try:
+        return float(response.headers["Retry-After"])
+    except (KeyError, ValueError):
+        return None
 
 
 class SupabaseResponse:
@@ -12,41 +104,92 @@ class SupabaseResponse:
         self.count = count
 
 
-class TableQuery:
-    """Query builder for Supabase REST API"""
+class BaseTableQuery:
+    """Query builder for Supabase REST API (shared by sync and async)
+    
+    Filters are Predicates (app/filters.py), ANDed together and rendered
+    into query params when the request is sent.
+    """
     
-    def __init__(self, base_url: str, headers: dict, table: str):
+    def __init__(self, base_url: str, headers: dict, table: str, client: Any):
+        self.client = client
+        self.table = table
         self.base_url = f"{base_url}/{table}"
-        self.headers = headers.copy()
+        # Shared with the client (or a PreparedQuery) until the first change
+        self.headers = headers
+        self._own_headers = False
         self.query_params = {}
+        self.filters = []
+        # Rendered params / metric labels from a PreparedQuery
+        self._bound_params = ()
+        self._bound_shapes = ()
         self._method = "GET"
         self._body = None
     
+    def _set_header(self, name: str, value: str):
+        if not self._own_headers:
+            self.headers = dict(self.headers)
+            self._own_headers = True
+        self.headers[name] = value
+    
     def select(self, columns: str = "*", count: str = None):
         self.query_params["select"] = columns
         if count:
-            self.headers["Prefer"] = f"count={count}"
+            self._set_header("Prefer", f"count={count}")
         return self
     
-    def eq(self, column: str, value: Any):
-        self.query_params[column] = f"eq.{value}"
+    def where(self, *predicates: Predicate):
+        """AND one or more predicates, e.g. where(col("age").gte(18), col("age").lte(30))"""
+        self.filters.extend(predicates)
         return self
     
+    def eq(self, column: str, value: Any):
+        return self.where(Condition(column, "eq", value))
+    
     def neq(self, column: str, value: Any):
-        self.query_params[column] = f"neq.{value}"
-        return self
+        return self.where(Condition(column, "neq", value))
+    
+    def gt(self, column: str, value: Any):
+        return self.where(Condition(column, "gt", value))
+    
+    def gte(self, column: str, value: Any):
+        return self.where(Condition(column, "gte", value))
+    
+    def lt(self, column: str, value: Any):
+        return self.where(Condition(column, "lt", value))
+    
+    def lte(self, column: str, value: Any):
+        return self.where(Condition(column, "lte", value))
+    
+    def in_(self, column: str, values: list):
+        return self.where(Condition(column, "in", list(values)))
+    
+    def is_(self, column: str, value: Optional[bool]):
+        """IS null / true / false"""
+        return self.where(Condition(column, "is", value))
+    
+    def like(self, column: str, pattern: str):
+        return self.where(Condition(column, "like", pattern))
     
     def ilike(self, column: str, pattern: str):
-        self.query_params[column] = f"ilike.{pattern}"
-        return self
+        return self.where(Condition(column, "ilike", pattern))
     
-    def or_(self, conditions: str):
-        self.query_params["or"] = f"({conditions})"
-        return self
+    def or_(self, *conditions: Predicate | str):
+        """Any of the predicates (or one raw PostgREST string, e.g. "a.eq.1,b.eq.2")"""
+        return self.where(tree("or", conditions))
+    
+    def and_(self, *conditions: Predicate | str):
+        return self.where(tree("and", conditions))
+    
+    def not_(self, predicate: Predicate):
+        return self.where(~predicate)
     
     def order(self, column: str, desc: bool = False):
+        """Order by column; call again to add tie-breaker columns"""
         direction = "desc" if desc else "asc"
-        self.query_params["order"] = f"{column}.{direction}"
+        existing = self.query_params.get("order")
+        term = f"{column}.{direction}"
+        self.query_params["order"] = f"{existing},{term}" if existing else term
         return self
     
     def limit(self, count: int):
@@ -54,94 +197,622 @@ class TableQuery:
         return self
     
     def range(self, start: int, end: int):
-        self.headers["Range"] = f"{start}-{end}"
+        self._set_header("Range", f"{start}-{end}")
         return self
     
-    def insert(self, data: dict):
+    def insert(
+        self,
+        data: dict | list,
+        upsert: bool = False,
+        on_conflict: Optional[str] = None,
+        ignore_duplicates: bool = False
+    ):
+        """Insert one row or a batch (list of rows), optionally as upsert"""
         self._method = "POST"
         self._body = data
-        self.headers["Prefer"] = "return=representation"
+        prefer = ["return=representation"]
+        
+        if ignore_duplicates:
+            prefer.append("resolution=ignore-duplicates")
+        elif upsert:
+            prefer.append("resolution=merge-duplicates")
+        if on_conflict:
+            self.query_params["on_conflict"] = on_conflict
+        
+        # Batch rows may have different keys - missing ones get column defaults
+        if isinstance(data, list):
+            columns = sorted({key for row in data for key in row})
+            self.query_params["columns"] = ",".join(columns)
+            prefer.append("missing=default")
+        
+        self._set_header("Prefer", ",".join(prefer))
         return self
     
     def update(self, data: dict):
         self._method = "PATCH"
         self._body = data
-        self.headers["Prefer"] = "return=representation"
+        self._set_header("Prefer", "return=representation")
         return self
     
     def delete(self):
         self._method = "DELETE"
-        self.headers["Prefer"] = "return=representation"
+        self._set_header("Prefer", "return=representation")
         return self
     
+    def prepare(self) -> "PreparedQuery":
+        """Freeze this query as a template; Param values are bound per call"""
+        return PreparedQuery(self)
+    
+    def params(self) -> list:
+        """(key, value) pairs for the request - repeated keys allowed
+        
+        select / order / limit set on a bound query replace the template's.
+        """
+        params = self._static_params()
+        for predicate in self.filters:
+            params.extend(predicate.params())
+        return params
+    
+    def _static_params(self) -> list:
+        if not self.query_params:
+            return list(self._bound_params)
+        params = [param for param in self._bound_params if param[0] not in self.query_params]
+        params.extend(self.query_params.items())
+        return params
+    
+    def filter_shape(self) -> str:
+        """Filters without values, e.g. 'email.eq,or' - a low-cardinality metric label"""
+        if not self.filters:
+            return ",".join(self._bound_shapes) or "-"
+        shapes = list(self._bound_shapes)
+        for predicate in self.filters:
+            shapes.extend(predicate.shapes())
+        return ",".join(sorted(shapes))
+    
+    def _record(self, started: float, status: Any, decode_started: Optional[float] = None):
+        """Upstream time (and decode time) for metrics / Server-Timing"""
+        finished = time.perf_counter()
+        upstream = (decode_started or finished) - started
+        decode = finished - decode_started if decode_started else 0.0
+        metrics.record_upstream(self._method, self.table, self.filter_shape(), status, upstream, decode)
+    
+    def _finish(self, response: httpx.Response, started: float) -> SupabaseResponse:
+        """Parse, recording call and decode time"""
+        decode_started = time.perf_counter()
+        try:
+            return self._parse(response)
+        finally:
+            self._record(started, response.status_code, decode_started)
+    
+    def _parse(self, response: httpx.Response) -> SupabaseResponse:
+        """Turn an httpx response into SupabaseResponse"""
+        # Error handling
+        if response.status_code >= 400:
+            raise error_from_response(response)
+        
+        # Parse response
+        data = response.json() if response.content else []
+        
+        # Get count from header if available
+        count = None
+        content_range = response.headers.get("content-range")
+        if content_range:
+            try:
+                count = int(content_range.split("/")[-1])
+            except:
+                count = len(data)
+        
+        return SupabaseResponse(data=data, count=count)
+
+
+class TableQuery(BaseTableQuery):
+    """Blocking query - for scripts and sync code"""
+    
     def execute(self) -> SupabaseResponse:
         """Execute the query"""
-        with httpx.Client(timeout=30.0) as client:
-            if self._method == "GET":
-                response = client.get(
-                    self.base_url,
-                    headers=self.headers,
-                    params=self.query_params
-                )
-            elif self._method == "POST":
-                response = client.post(
-                    self.base_url,
-                    headers=self.headers,
-                    params=self.query_params,
-                    json=self._body
-                )
-            elif self._method == "PATCH":
-                response = client.patch(
-                    self.base_url,
-                    headers=self.headers,
-                    params=self.query_params,
-                    json=self._body
-                )
-            elif self._method == "DELETE":
-                response = client.delete(
-                    self.base_url,
-                    headers=self.headers,
-                    params=self.query_params
-                )
-            
-            # Error handling
-            if response.status_code >= 400:
-                error_detail = response.text
-                raise Exception(f"Database error: {response.status_code} - {error_detail}")
-            
-            # Parse response
-            data = response.json() if response.text else []
-            
-            # Get count from header if available
-            count = None
-            content_range = response.headers.get("content-range")
-            if content_range:
-                try:
-                    count = int(content_range.split("/")[-1])
-                except:
-                    count = len(data)
-            
-            return SupabaseResponse(data=data, count=count)
-
-
-class SupabaseClient:
-    """Simple Supabase client using REST API"""
+        started = time.perf_counter()
+        try:
+            response = self.client.request(
+                self._method,
+                self.base_url,
+                headers=self.headers,
+                params=self.params(),
+                json=self._body
+            )
+        except UpstreamUnavailableError:
+            self._record(started, "error")
+            raise
+        return self._finish(response, started)
+    
+    def execute_iter(self) -> Iterator[Any]:
+        """Execute and yield rows as they are decoded - bounded memory, no count"""
+        started = time.perf_counter()
+        status = "error"
+        try:
+            with self.client.stream(
+                self._method,
+                self.base_url,
+                headers=self.headers,
+                params=self.params(),
+                json=self._body
+            ) as response:
+                status = response.status_code
+                if response.status_code >= 400:
+                    response.read()
+                    raise error_from_response(response)
+                yield from iter_json_array(response.iter_text())
+        finally:
+            # Whole stream as one call (decode is interleaved with reading)
+            self._record(started, status)
+
+
+class AsyncTableQuery(BaseTableQuery):
+    """Non-blocking query - used by the API"""
+    
+    # Headers that change the result of a GET
+    COALESCE_HEADERS = ("Prefer", "Range", "Accept")
+    
+    async def execute(self) -> SupabaseResponse:
+        """Execute the query (identical concurrent GETs share one request)"""
+        params = self.params()
+        if self._method == "GET" and self.client.singleflight is not None:
+            key = self.coalesce_key(params)
+            return await self.client.singleflight.do(key, lambda: self._send(params))
+        try:
+            return await self._send(params)
+        finally:
+            if self._method not in self.client.IDEMPOTENT_METHODS:
+                # Failed writes too - the row may have changed anyway
+                self.client.wrote(self.table)
+    
+    def coalesce_key(self, params: list) -> tuple:
+        """Identical GETs (same URL, params in any order, result headers) share this key
+        
+        The table's write generation is part of it, so a read that starts
+        after a write completed never joins a flight sent before it.
+        """
+        return (
+            self._method,
+            self.base_url,
+            tuple(sorted(params)),
+            tuple(map(self.headers.get, self.COALESCE_HEADERS)),
+            self.client.write_generation(self.table)
+        )
+    
+    async def _send(self, params: list) -> SupabaseResponse:
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(
+                self._method,
+                self.base_url,
+                headers=self.headers,
+                params=params,
+                json=self._body
+            )
+        except UpstreamUnavailableError:
+            self._record(started, "error")
+            raise
+        return self._finish(response, started)
+    
+    async def execute_iter(self) -> AsyncIterator[Any]:
+        """Execute and yield rows as they are decoded - bounded memory, no count
+        
+        Not coalesced; the connection is held until the rows are consumed.
+        """
+        started = time.perf_counter()
+        status = "error"
+        try:
+            async with self.client.stream(
+                self._method,
+                self.base_url,
+                headers=self.headers,
+                params=self.params(),
+                json=self._body
+            ) as response:
+                status = response.status_code
+                if response.status_code >= 400:
+                    await response.aread()
+                    raise error_from_response(response)
+                async for row in aiter_json_array(response.aiter_text()):
+                    yield row
+        finally:
+            # Whole stream as one call (decode is interleaved with reading)
+            self._record(started, status)
+
+
+class PreparedQuery:
+    """A hot query with its URL, static params, headers and metric label built once
+    
+        by_email = client.from_("profiles").select("*").eq("email", Param("email")).prepare()
+        response = await by_email.bind(email=email).execute()
+    
+    bind() only renders the conditions holding a Param. The bound query
+    can still be extended per call: select / order / limit replace the
+    template's, range / count / filters are added.
+    """
+    
+    def __init__(self, query: BaseTableQuery):
+        if query._method != "GET":
+            raise ValueError("Only reads can be prepared")
+        self.query_class = type(query)
+        self.client = query.client
+        self.table = query.table
+        self.url = query.base_url
+        self.headers = dict(query.headers)
+        self.params = query._static_params()
+        shapes = list(query._bound_shapes)
+        # column.op.Param conditions -> (column, "op.", name); other Param trees rendered whole
+        self.slots = []
+        self.trees = []
+        for predicate in query.filters:
+            shapes.extend(predicate.shapes())
+            if not predicate.has_params():
+                self.params.extend(predicate.params())
+            elif isinstance(predicate, Condition) and predicate.operator not in ("in", "is"):
+                self.slots.append((predicate.column, f"{predicate.prefix}{predicate.operator}.", predicate.value.name))
+            else:
+                self.trees.append(predicate)
+        self.shapes = tuple(sorted(shapes))
+    
+    def bind(self, **values) -> BaseTableQuery:
+        """New query with the Param values filled in"""
+        # Skips __init__ - URL and headers are reused as they are
+        query = self.query_class.__new__(self.query_class)
+        query.client = self.client
+        query.table = self.table
+        query.base_url = self.url
+        query.headers = self.headers
+        query._own_headers = False
+        query.query_params = {}
+        query.filters = []
+        params = self.params.copy()
+        for column, operator, name in self.slots:
+            params.append((column, operator + literal(values[name])))
+        for predicate in self.trees:
+            params.extend(predicate.params(values))
+        query._bound_params = params
+        query._bound_shapes = self.shapes
+        query._method = "GET"
+        query._body = None
+        return query
+
+
+class PoolStats:
+    """Connection pool counters (thread safe)"""
     
     def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.pool_hits = 0
+        self.pool_misses = 0
+        self.in_flight = 0
+    
+    def started(self):
+        with self._lock:
+            self.requests += 1
+            self.in_flight += 1
+    
+    def finished(self, new_connection: bool):
+        with self._lock:
+            self.in_flight -= 1
+            if new_connection:
+                self.pool_misses += 1
+            else:
+                self.pool_hits += 1
+    
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "pool_hits": self.pool_hits,
+                "pool_misses": self.pool_misses,
+                "in_flight": self.in_flight
+            }
+
+
+class BaseSupabaseClient:
+    """Config shared by the sync and async clients"""
+    
+    def __init__(self, transport: Any = None):
+        self.settings = settings = get_settings()
         self.base_url = f"{settings.supabase_url}/rest/v1"
         self.headers = {
             "apikey": settings.supabase_key,
             "Authorization": f"Bearer {settings.supabase_key}",
             "Content-Type": "application/json"
         }
+        self.limits = httpx.Limits(
+            max_connections=settings.db_max_connections,
+            max_keepalive_connections=settings.db_max_keepalive_connections,
+            keepalive_expiry=settings.db_keepalive_expiry
+        )
+        self.timeout = httpx.Timeout(
+            connect=settings.db_connect_timeout,
+            read=settings.db_read_timeout,
+            write=settings.db_write_timeout,
+            pool=settings.db_pool_timeout
+        )
+        self.stats = PoolStats()
+        self._transport = transport
+        self._http = None
+        self._lock = threading.Lock()
+    
+    def _client_kwargs(self) -> dict:
+        return {
+            "limits": self.limits,
+            "timeout": self.timeout,
+            "http2": self.settings.db_http2,
+            "transport": self._transport
+        }
+    
+    def use_transport(self, transport: Any):
+        """Send requests through another httpx transport (benchmarks / local fakes)
+        
+        Takes effect on the next open().
+        """
+        self._transport = transport
+    
+    def rpc(self, function: str, params: Optional[dict] = None):
+        """Call a Postgres function (POST /rpc/<function>)"""
+        query = self.from_(f"rpc/{function}")
+        query._method = "POST"
+        query._body = params or {}
+        return query
+    
+    def pool_stats(self) -> dict:
+        stats = self.stats.snapshot()
+        stats["max_connections"] = self.limits.max_connections
+        stats["http2"] = self.settings.db_http2
+        return stats
+
+
+class SupabaseClient(BaseSupabaseClient):
+    """Simple Supabase client using REST API (blocking)
+    
+    Owns one long-lived httpx.Client so connections (and TLS sessions)
+    are reused across queries. Kept for scripts; the API uses AsyncSupabaseClient.
+    """
+    
+    def open(self) -> httpx.Client:
+        """Create the pooled HTTP client (idempotent)"""
+        with self._lock:
+            if self._http is None:
+                self._http = httpx.Client(**self._client_kwargs())
+            return self._http
+    
+    def close(self):
+        """Close pooled connections"""
+        with self._lock:
+            if self._http is not None:
+                self._http.close()
+                self._http = None
+    
+    def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """Send one request through the shared pool"""
+        http = self._http or self.open()
+        connected = []
+        
+        def trace(event: str, info: dict):
+            # New TCP connection = pool miss
+            if event == "connection.connect_tcp.started":
+                connected.append(True)
+        
+        self.stats.started()
+        try:
+            return http.request(method, url, extensions={"trace": trace}, **kwargs)
+        except httpx.TransportError as e:
+            raise UpstreamUnavailableError(503, f"{type(e).__name__}: {e}")
+        finally:
+            self.stats.finished(new_connection=bool(connected))
+    
+    @contextmanager
+    def stream(self, method: str, url: str, **kwargs) -> Iterator[httpx.Response]:
+        """Like request(), but the caller reads the body incrementally"""
+        http = self._http or self.open()
+        connected = []
+        
+        def trace(event: str, info: dict):
+            if event == "connection.connect_tcp.started":
+                connected.append(True)
+        
+        self.stats.started()
+        try:
+            with http.stream(method, url, extensions={"trace": trace}, **kwargs) as response:
+                yield response
+        except httpx.TransportError as e:
+            raise UpstreamUnavailableError(503, f"{type(e).__name__}: {e}")
+        finally:
+            self.stats.finished(new_connection=bool(connected))
     
     def from_(self, table: str) -> TableQuery:
-        return TableQuery(self.base_url, self.headers, table)
+        return TableQuery(self.base_url, self.headers, table, self)
     
     def table(self, table: str) -> TableQuery:
         """Alias for from_"""
         return self.from_(table)
 
 
-# Global client instance
-db_client = SupabaseClient()
\ No newline at end of file
+class AsyncSupabaseClient(BaseSupabaseClient):
+    """Supabase client on httpx.AsyncClient - no threadpool per query"""
+    
+    # Safe to send twice; everything else is tried once
+    IDEMPOTENT_METHODS = ("GET", "HEAD")
+    # Upstream overloaded / restarting - worth another try
+    RETRY_STATUSES = (429, 502, 503, 504)
+    # Counted against the circuit breaker (429 is a healthy "slow down")
+    FAILURE_STATUSES = (502, 503, 504)
+    
+    def __init__(self, transport: Any = None):
+        super().__init__(transport)
+        settings = self.settings
+        self.singleflight = SingleFlight() if settings.db_coalesce_reads else None
+        # table -> completed writes (None: rpc calls, which may touch any table)
+        self.write_generations: dict = {}
+        self.retry = RetryPolicy(
+            attempts=settings.db_retry_attempts,
+            base_delay=settings.db_retry_base_delay,
+            max_delay=settings.db_retry_max_delay
+        )
+        self.breaker = CircuitBreaker(
+            failure_threshold=settings.circuit_failure_threshold,
+            reset_timeout=settings.circuit_reset_timeout
+        )
+        self.limiter = ConcurrencyLimiter(settings.db_max_concurrency, settings.db_queue_timeout)
+    
+    def wrote(self, table: str):
+        """Record a completed write - later reads of the table get a new flight"""
+        scope = None if table.startswith("rpc/") else table
+        self.write_generations[scope] = self.write_generations.get(scope, 0) + 1
+    
+    def write_generation(self, table: str) -> tuple:
+        return (self.write_generations.get(table, 0), self.write_generations.get(None, 0))
+    
+    def pool_stats(self) -> dict:
+        stats = super().pool_stats()
+        if self.singleflight is not None:
+            stats["reads"] = self.singleflight.stats()
+        stats["circuit"] = self.breaker.stats()
+        stats["concurrency"] = self.limiter.stats()
+        return stats
+    
+    def open(self) -> httpx.AsyncClient:
+        """Create the pooled HTTP client (idempotent)"""
+        with self._lock:
+            if self._http is None:
+                self._http = httpx.AsyncClient(**self._client_kwargs())
+            return self._http
+    
+    async def close(self):
+        """Close pooled connections"""
+        http, self._http = self._http, None
+        if http is not None:
+            await http.aclose()
+    
+    @asynccontextmanager
+    async def guard(self) -> AsyncIterator[list]:
+        """Circuit breaker + concurrency limit around one upstream call
+        
+        Yields a list; append False if the response means Supabase is
+        unhealthy. UpstreamUnavailableError raised inside counts as a
+        failure, other DatabaseErrors as a healthy answer.
+        """
+        wait = self.breaker.allow()
+        if wait is not None:
+            metrics.upstream_shed.inc("circuit_open")
+            raise CircuitOpenError(503, "Upstream circuit open", retry_after=wait)
+        if not await self.limiter.acquire():
+            self.breaker.record(None)
+            metrics.upstream_shed.inc("queue_timeout")
+            raise LoadShedError(503, "Too many upstream calls in flight", retry_after=1)
+        
+        outcome = []
+        try:
+            yield outcome
+        except UpstreamUnavailableError:
+            self.breaker.record(False)
+            raise
+        except DatabaseError:
+            self.breaker.record(True)
+            raise
+        except BaseException:
+            self.breaker.record(None)
+            raise
+        else:
+            self.breaker.record(all(outcome))
+        finally:
+            self.limiter.release()
+    
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """Send one request through the breaker, limiter and retry policy
+        
+        Idempotent methods are retried (jittered backoff) on network
+        errors and 429 / 502-504; shed calls are never retried.
+        """
+        retries = self.retry.attempts if method in self.IDEMPOTENT_METHODS else 0
+        for attempt in range(retries + 1):
+            last = attempt == retries
+            try:
+                async with self.guard() as outcome:
+                    response = await self._send(method, url, **kwargs)
+                    outcome.append(response.status_code not in self.FAILURE_STATUSES)
+            except LoadShedError:
+                raise
+            except UpstreamUnavailableError:
+                if last:
+                    raise
+            else:
+                if last or response.status_code not in self.RETRY_STATUSES:
+                    return response
+                await response.aclose()
+            metrics.upstream_retries.inc(method)
+            await asyncio.sleep(self.retry.delay(attempt))
+    
+    async def _send(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """One attempt through the shared pool"""
+        http = self._http or self.open()
+        connected = []
+        
+        async def trace(event: str, info: dict):
+            # New TCP connection = pool miss
+            if event == "connection.connect_tcp.started":
+                connected.append(True)
+        
+        self.stats.started()
+        try:
+            return await http.request(method, url, extensions={"trace": trace}, **kwargs)
+        except httpx.TransportError as e:
+            raise UpstreamUnavailableError(503, f"{type(e).__name__}: {e}")
+        finally:
+            self.stats.finished(new_connection=bool(connected))
+    
+    @asynccontextmanager
+    async def stream(self, method: str, url: str, **kwargs) -> AsyncIterator[httpx.Response]:
+        """Like request(), but the caller reads the body incrementally
+        
+        Breaker and limiter apply; no retries (rows may already be consumed).
+        """
+        http = self._http or self.open()
+        connected = []
+        
+        async def trace(event: str, info: dict):
+            if event == "connection.connect_tcp.started":
+                connected.append(True)
+        
+        async with self.guard():
+            self.stats.started()
+            try:
+                async with http.stream(method, url, extensions={"trace": trace}, **kwargs) as response:
+                    yield response
+            except httpx.TransportError as e:
+                raise UpstreamUnavailableError(503, f"{type(e).__name__}: {e}")
+            finally:
+                self.stats.finished(new_connection=bool(connected))
+    
+    def from_(self, table: str) -> AsyncTableQuery:
+        return AsyncTableQuery(self.base_url, self.headers, table, self)
+    
+    def table(self, table: str) -> AsyncTableQuery:
+        """Alias for from_"""
+        return self.from_(table)
+
+
+# ============ SHARED CLIENTS ============
+# Built on first use, not at import: importing the app (e.g. gunicorn
+# --preload) does no settings parsing, and each worker builds its own.
+@lru_cache()
+def get_db_client() -> SupabaseClient:
+    return SupabaseClient()
+
+
+@lru_cache()
+def get_async_db_client() -> AsyncSupabaseClient:
+    return AsyncSupabaseClient()
+
+
+def __getattr__(name: str):
+    # Old module attributes: `from app.database import async_db_client`
+    if name == "db_client":
+        return get_db_client()
+    if name == "async_db_client":
+        return get_async_db_client()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,254 @@
+"""PostgREST filter predicates: conditions, and / or / not trees
+
+    from app.filters import col, Param
+
+    query.where(col("role").in_(["user", "institution"]), col("is_active").eq(True))
+    query.where(col("full_name").ilike("%ra%") | col("email").ilike("%ra%"))
+    query.where(~col("created_at").between("2024-01-01", "2024-12-31"))
+
+Values are rendered when the request is built - double-quoted where the
+PostgREST grammar needs it (in.() lists, inside or/and trees) - and httpx
+percent-encodes the result. Top-level ANDs become one query param each,
+so a column can be filtered more than once. A Param in place of a value
+leaves a slot that PreparedQuery.bind() fills per call.
+"""
+from typing import Any, Optional
+
+# Characters that must be quoted inside PostgREST in.() lists and or/and trees
+RESERVED_CHARS = set(',.:()"\\ ')
+
+LOGIC_KEYS = ("or", "and", "not.or", "not.and")
+
+
+def quote_filter_value(value: Any, always: bool = False) -> str:
+    """Double-quote a filter value when PostgREST syntax requires it"""
+    value = str(value)
+    if always or any(char in RESERVED_CHARS for char in value):
+        escaped = value.replace("\\", "\\\\").replace('"', '\\"')
+        return f'"{escaped}"'
+    return value
+
+
+def literal(value: Any) -> str:
+    """Python value -> PostgREST text (True -> true, None -> null)"""
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return str(value)
+
+
+class Param:
+    """Placeholder for a value bound per call (see PreparedQuery)"""
+
+    __slots__ = ("name",)
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __repr__(self) -> str:
+        return f"Param({self.name!r})"
+
+
+class Predicate:
+    """Filter node; & | ~ build and / or / not trees"""
+
+    __slots__ = ("negated",)
+
+    def __and__(self, other: "Predicate") -> "Group":
+        return Group("and", (self, other))
+
+    def __or__(self, other: "Predicate") -> "Group":
+        return Group("or", (self, other))
+
+    def __invert__(self) -> "Predicate":
+        node = self._copy()
+        node.negated = not self.negated
+        return node
+
+    @property
+    def prefix(self) -> str:
+        return "not." if self.negated else ""
+
+    def params(self, values: Optional[dict] = None) -> list:
+        """(key, value) query params for this node at the top level"""
+        return [self.param(values)]
+
+    def shapes(self) -> list:
+        """Metric labels matching params() - columns / operators, no values"""
+        return [self.shape()]
+
+    def param(self, values: Optional[dict] = None) -> tuple:
+        raise NotImplementedError
+
+    def term(self, values: Optional[dict] = None) -> str:
+        """This node inside an or/and tree"""
+        raise NotImplementedError
+
+    def shape(self) -> str:
+        raise NotImplementedError
+
+    def has_params(self) -> bool:
+        return False
+
+    def _copy(self) -> "Predicate":
+        raise NotImplementedError
+
+
+class Condition(Predicate):
+    """column.operator.value"""
+
+    __slots__ = ("column", "operator", "value")
+
+    def __init__(self, column: str, operator: str, value: Any, negated: bool = False):
+        self.column = column
+        self.operator = operator
+        self.value = value
+        self.negated = negated
+
+    def _operand(self, nested: bool, values: Optional[dict]) -> str:
+        value = self.value
+        if isinstance(value, Param):
+            value = values[value.name]
+        if self.operator == "in":
+            return "(" + ",".join(quote_filter_value(literal(item)) for item in value) + ")"
+        text = literal(value)
+        # Top-level values are taken verbatim; tree values stop at , and )
+        return quote_filter_value(text) if nested and self.operator != "is" else text
+
+    def param(self, values=None):
+        return self.column, f"{self.prefix}{self.operator}.{self._operand(False, values)}"
+
+    def term(self, values=None):
+        return f"{self.column}.{self.prefix}{self.operator}.{self._operand(True, values)}"
+
+    def shape(self):
+        return f"{self.column}.{self.prefix}{self.operator}"
+
+    def has_params(self):
+        return isinstance(self.value, Param)
+
+    def _copy(self):
+        return Condition(self.column, self.operator, self.value, self.negated)
+
+
+class Group(Predicate):
+    """and / or over child predicates"""
+
+    __slots__ = ("operator", "children")
+
+    def __init__(self, operator: str, children, negated: bool = False):
+        self.operator = operator
+        self.negated = negated
+        # (a & b) & c -> and(a, b, c)
+        flat = []
+        for child in children:
+            if isinstance(child, Group) and child.operator == operator and not child.negated:
+                flat.extend(child.children)
+            else:
+                flat.append(child)
+        self.children = tuple(flat)
+
+    def params(self, values=None):
+        # Top-level filters are ANDed already - one param per child
+        if self.operator == "and" and not self.negated:
+            return [param for child in self.children for param in child.params(values)]
+        return [self.param(values)]
+
+    def shapes(self):
+        if self.operator == "and" and not self.negated:
+            return [shape for child in self.children for shape in child.shapes()]
+        return [self.shape()]
+
+    def param(self, values=None):
+        return f"{self.prefix}{self.operator}", "(" + ",".join(child.term(values) for child in self.children) + ")"
+
+    def term(self, values=None):
+        return f"{self.prefix}{self.operator}(" + ",".join(child.term(values) for child in self.children) + ")"
+
+    def shape(self):
+        return f"{self.prefix}{self.operator}"
+
+    def has_params(self):
+        return any(child.has_params() for child in self.children)
+
+    def _copy(self):
+        return Group(self.operator, self.children, self.negated)
+
+
+class Raw(Predicate):
+    """Pre-rendered or/and body, e.g. or_("a.eq.1,b.eq.2")"""
+
+    __slots__ = ("operator", "text")
+
+    def __init__(self, operator: str, text: str, negated: bool = False):
+        self.operator = operator
+        self.text = text
+        self.negated = negated
+
+    def param(self, values=None):
+        return f"{self.prefix}{self.operator}", f"({self.text})"
+
+    def term(self, values=None):
+        return f"{self.prefix}{self.operator}({self.text})"
+
+    def shape(self):
+        return f"{self.prefix}{self.operator}"
+
+    def _copy(self):
+        return Raw(self.operator, self.text, self.negated)
+
+
+def tree(operator: str, conditions: tuple) -> Predicate:
+    """or_ / and_ arguments -> one node (a single string is taken as raw syntax)"""
+    if len(conditions) == 1 and isinstance(conditions[0], str):
+        return Raw(operator, conditions[0])
+    return Group(operator, conditions)
+
+
+class Column:
+    """col("email").eq(value) -> Condition"""
+
+    __slots__ = ("name",)
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def eq(self, value: Any) -> Condition:
+        return Condition(self.name, "eq", value)
+
+    def neq(self, value: Any) -> Condition:
+        return Condition(self.name, "neq", value)
+
+    def gt(self, value: Any) -> Condition:
+        return Condition(self.name, "gt", value)
+
+    def gte(self, value: Any) -> Condition:
+        return Condition(self.name, "gte", value)
+
+    def lt(self, value: Any) -> Condition:
+        return Condition(self.name, "lt", value)
+
+    def lte(self, value: Any) -> Condition:
+        return Condition(self.name, "lte", value)
+
+    def like(self, pattern: Any) -> Condition:
+        return Condition(self.name, "like", pattern)
+
+    def ilike(self, pattern: Any) -> Condition:
+        return Condition(self.name, "ilike", pattern)
+
+    def in_(self, values: Any) -> Condition:
+        return Condition(self.name, "in", values if isinstance(values, Param) else list(values))
+
+    def is_(self, value: Optional[bool]) -> Condition:
+        """IS null / true / false"""
+        return Condition(self.name, "is", value)
+
+    def between(self, low: Any, high: Any) -> Group:
+        """low <= column <= high"""
+        return Group("and", (self.gte(low), self.lte(high)))
+
+
+def col(name: str) -> Column:
+    return Column(name)
@@ -0,0 +1,108 @@
+import base64
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+from fastapi import Request, Response
+from pydantic import BaseModel
+from app import serialization
+
+
+# ============ ETAGS ============
+def profile_etag(profile: dict, write_token: Optional[str] = None) -> str:
+    """Strong ETag from id + updated_at (decodable for If-Match)
+
+    write_token versions write-behind fields not flushed yet - they change
+    the row without moving updated_at.
+    """
+    raw = f"{profile['id']}|{profile.get('updated_at')}"
+    if write_token:
+        raw += f"|{write_token}"
+    return '"' + base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=") + '"'
+
+
+def parse_profile_etag(etag: str) -> Optional[tuple[str, str, Optional[str]]]:
+    """ETag -> (id, updated_at, write_token), None if it is not one of ours"""
+    value = etag.strip()
+    if value.startswith("W/"):
+        return None  # weak tags never satisfy If-Match
+    value = value.strip('"')
+    try:
+        parts = base64.urlsafe_b64decode(value + "=" * (-len(value) % 4)).decode().split("|")
+    except ValueError:
+        return None
+    if len(parts) == 2:
+        return parts[0], parts[1], None
+    if len(parts) == 3:
+        return parts[0], parts[1], parts[2]
+    return None
+
+
+def body_etag(body: bytes) -> str:
+    """Strong ETag from a hash of the serialized body (list pages)"""
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def parse_timestamp(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+# ============ CONDITIONAL RESPONSES ============
+def _etag_matches(header: str, etag: str) -> bool:
+    if header.strip() == "*":
+        return True
+    candidates = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return etag.removeprefix("W/") in candidates
+
+
+def is_not_modified(request: Request, etag: Optional[str], last_modified: Optional[datetime]) -> bool:
+    """If-None-Match wins over If-Modified-Since (RFC 9110)"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag is not None and _etag_matches(if_none_match, etag)
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        return last_modified.replace(microsecond=0) <= since
+    return False
+
+
+def cached_json(
+    request: Request,
+    payload: BaseModel,
+    cache_control: str,
+    etag: Optional[str] = None,
+    last_modified: Optional[datetime] = None
+) -> Response:
+    """JSON response with ETag / Last-Modified / Cache-Control, or an empty 304
+
+    Without an explicit etag the body is serialized once and hashed.
+    """
+    headers = {"Cache-Control": cache_control}
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(last_modified.astimezone(timezone.utc), usegmt=True)
+
+    body = None
+    if etag is None:
+        body = serialization.render(payload)
+        etag = body_etag(body)
+    headers["ETag"] = etag
+
+    if is_not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+
+    if body is None:
+        body = serialization.render(payload)
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -0,0 +1,96 @@
+"""Incremental decoding of a top-level JSON array (PostgREST row lists)
+
+Text is fed in chunks as it arrives; complete elements are decoded with
+JSONDecoder.raw_decode and handed out one at a time, so memory stays at
+about one chunk plus one row instead of body bytes + str + full list.
+"""
+import json
+from typing import AsyncIterator, Iterable, Iterator
+
+_decoder = json.JSONDecoder()
+WHITESPACE = " \t\n\r"
+DELIMITERS = WHITESPACE + ",]"
+
+
+class JsonArrayDecoder:
+    """Feed text chunks of '[{...},{...}]', get decoded elements back"""
+
+    def __init__(self):
+        self._buffer = ""
+        self._pos = 0
+        self._started = False
+        self._done = False
+        self._after_item = False  # next token must be ',' or ']'
+
+    def _skip_whitespace(self):
+        buffer, pos = self._buffer, self._pos
+        while pos < len(buffer) and buffer[pos] in WHITESPACE:
+            pos += 1
+        self._pos = pos
+
+    def feed(self, text: str, final: bool = False) -> list:
+        """Elements completed by this chunk (final=True: no more text follows)"""
+        if self._pos:
+            # Drop what is already decoded before growing the buffer
+            self._buffer = self._buffer[self._pos:]
+            self._pos = 0
+        self._buffer += text
+        items = []
+
+        while not self._done:
+            self._skip_whitespace()
+            if self._pos >= len(self._buffer):
+                break
+            char = self._buffer[self._pos]
+
+            if not self._started:
+                if char != "[":
+                    raise ValueError(f"Expected a JSON array, got {char!r}")
+                self._started = True
+                self._pos += 1
+                continue
+            if char == "]":
+                self._done = True
+                self._pos += 1
+                break
+            if self._after_item:
+                if char != ",":
+                    raise ValueError(f"Expected ',' or ']' in JSON array, got {char!r}")
+                self._after_item = False
+                self._pos += 1
+                continue
+
+            try:
+                item, end = _decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                if final:
+                    raise
+                break  # element not complete yet
+            if not final and (end == len(self._buffer) or self._buffer[end] not in DELIMITERS):
+                break  # a number could still continue in the next chunk ("-7." + "5")
+            items.append(item)
+            self._pos = end
+            self._after_item = True
+
+        if final:
+            self._skip_whitespace()
+            # An empty body counts as no rows (same as execute())
+            if self._started and not self._done or self._pos != len(self._buffer):
+                raise ValueError("Truncated or trailing data after JSON array")
+        return items
+
+
+def iter_json_array(chunks: Iterable[str]) -> Iterator:
+    decoder = JsonArrayDecoder()
+    for chunk in chunks:
+        yield from decoder.feed(chunk)
+    yield from decoder.feed("", final=True)
+
+
+async def aiter_json_array(chunks: AsyncIterator[str]) -> AsyncIterator:
+    decoder = JsonArrayDecoder()
+    async for chunk in chunks:
+        for item in decoder.feed(chunk):
+            yield item
+    for item in decoder.feed("", final=True):
+        yield item
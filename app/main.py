@@ -1,30 +1,73 @@
-from fastapi import FastAPI
+"""App factory
+
+    uvicorn app.main:create_app --factory
+    gunicorn "app.main:create_app()" -k uvicorn.workers.UvicornWorker -w 2 --preload
+
+Importing this module only defines things: settings are read in
+create_app(), and the connection pool, profile service (caches, stats,
+search, change feed) and background tasks are built in the lifespan,
+i.e. once per worker after a --preload fork. `app.main:app` still works
+(built on first access).
+"""
+import asyncio
+import math
+from contextlib import asynccontextmanager
+from fastapi import APIRouter, FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
+from app import metrics
+from app.admission import AdmissionController, AdmissionMiddleware
+from app.database import get_db_client, get_async_db_client, DatabaseError, UpstreamUnavailableError
+from app.config import get_settings
 from app.routes import profile
+from app.services.profile_service import get_profile_service
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Startup - connection pool aur service banao (per worker)
+    client = get_async_db_client()
+    client.open()
+    service = get_profile_service()
+    tasks = [
+        asyncio.create_task(
+            service.run_stats_reconciler(get_settings().stats_reconcile_interval)
+        ),
+        asyncio.create_task(service.run_autocomplete_builder())
+    ]
+    if service.change_feed is not None:
+        tasks.append(asyncio.create_task(
+            service.change_feed.run(get_settings().change_feed_interval)
+        ))
+    yield
+    # Shutdown - pool band karo
+    for task in tasks:
+        task.cancel()
+    # Queued write-behind updates go out before the pool closes
+    await service.flush_writes()
+    await client.close()
+    get_db_client().close()
+
+
+# Database errors -> 502 / 503 instead of a bare 500
+async def database_error_handler(request: Request, exc: DatabaseError):
+    if isinstance(exc, UpstreamUnavailableError):
+        # Shed / retried-out calls tell clients when to come back
+        retry_after = math.ceil(exc.retry_after) if exc.retry_after else 1
+        return JSONResponse(
+            status_code=503,
+            content={"detail": str(exc)},
+            headers={"Retry-After": str(retry_after)}
+        )
+    return JSONResponse(status_code=502, content={"detail": str(exc)})
+
 
-app = FastAPI(
-    title="Profile API",
-    description="Profile Management API with Supabase",
-    version="1.0.0",
-    docs_url="/docs",
-    redoc_url="/redoc"
-)
-
-# CORS
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# Routes
-app.include_router(profile.router, prefix="/api/v1")
-
-
-@app.get("/")
-def root():
+# ============ SERVICE ROUTES ============
+meta = APIRouter()
+
+
+@meta.get("/")
+async def root():
     return {
         "message": "Welcome to Profile API!",
         "docs": "/docs",
@@ -32,6 +75,80 @@ def root():
     }
 
 
-@app.get("/health")
-def health_check():
-    return {"status": "healthy", "message": "API is running!"}
\ No newline at end of file
+@meta.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """Prometheus text format"""
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
+
+
+@meta.get("/health")
+async def health_check(request: Request):
+    service = get_profile_service()
+    admission = request.app.state.admission
+    return {
+        "status": "healthy",
+        "message": "API is running!",
+        "db_pool": get_async_db_client().pool_stats(),
+        "write_behind": service.write_behind.stats() if service.write_behind is not None else None,
+        "change_feed": service.change_feed.stats() if service.change_feed is not None else None,
+        "admission": admission.stats() if admission is not None else None
+    }
+
+
+# ============ FACTORY ============
+def create_app() -> FastAPI:
+    """Build the FastAPI app from Settings (no network / pool until startup)"""
+    settings = get_settings()
+
+    app = FastAPI(
+        title="Profile API",
+        description="Profile Management API with Supabase",
+        version="1.0.0",
+        docs_url="/docs",
+        redoc_url="/redoc",
+        lifespan=lifespan
+    )
+
+    # Per route class limits / queues (innermost: shed 503s still get CORS
+    # headers and show up in metrics)
+    admission = AdmissionController(settings.admission_classes) if settings.admission_enabled else None
+    app.state.admission = admission
+    if admission is not None:
+        app.add_middleware(AdmissionMiddleware, controller=admission)
+
+    # CORS
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    # Per-request timings (outermost, so it sees the whole request)
+    if settings.metrics_enabled:
+        app.add_middleware(
+            metrics.MetricsMiddleware,
+            slow_ms=settings.slow_request_log_ms,
+            server_timing=settings.server_timing_enabled
+        )
+
+    app.add_exception_handler(DatabaseError, database_error_handler)
+
+    # Routes
+    app.include_router(profile.router, prefix="/api/v1")
+    app.include_router(meta)
+    return app
+
+
+_app = None
+
+
+def __getattr__(name: str):
+    # `uvicorn app.main:app` / `from app.main import app` - built once, on first access
+    global _app
+    if name == "app":
+        if _app is None:
+            _app = create_app()
+        return _app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
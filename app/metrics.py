@@ -0,0 +1,280 @@
+"""Per-request timings, Server-Timing header and Prometheus /metrics
+
+Each HTTP request gets a RequestTimings in a contextvar. The query layer
+adds one entry per upstream call (method, table, filter shape, time,
+decode time) and the serializer adds its time. MetricsMiddleware turns
+that into a Server-Timing header, a structured log line for slow
+requests and Prometheus counters / histograms (text format, no client
+library).
+"""
+import json
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CALL_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21)
+
+
+# ============ PROMETHEUS PRIMITIVES ============
+def _escape(value: object) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _series_key(item: tuple) -> tuple:
+    # Label values may mix types (status 200 / "error")
+    return tuple(str(value) for value in item[0])
+
+
+def _label_text(names: tuple, values: tuple) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labels: tuple = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self._values: dict = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount: float = 1.0):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for label_values, value in sorted(self._values.items(), key=_series_key):
+                lines.append(f"{self.name}{_label_text(self.labels, label_values)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.buckets = buckets
+        # label values -> [per-bucket counts..., +Inf count], sum
+        self._series: dict = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        names = self.labels + ("le",)
+        with self._lock:
+            for label_values, (counts, total) in sorted(self._series.items(), key=_series_key):
+                cumulative = 0
+                for bound, count in zip(self.buckets + ("+Inf",), counts):
+                    cumulative += count
+                    lines.append(f"{self.name}_bucket{_label_text(names, label_values + (bound,))} {cumulative}")
+                labels = _label_text(self.labels, label_values)
+                lines.append(f"{self.name}_sum{labels} {total}")
+                lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: list = []
+
+    def counter(self, *args, **kwargs) -> Counter:
+        metric = Counter(*args, **kwargs)
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(self, *args, **kwargs) -> Histogram:
+        metric = Histogram(*args, **kwargs)
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(line for metric in self.metrics for line in metric.render()) + "\n"
+
+
+registry = Registry()
+
+http_requests = registry.counter(
+    "http_requests_total", "HTTP requests", ("method", "route", "status")
+)
+http_duration = registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency", ("method", "route")
+)
+http_upstream_calls = registry.histogram(
+    "http_request_upstream_calls", "Upstream calls per HTTP request", ("route",), CALL_COUNT_BUCKETS
+)
+upstream_requests = registry.counter(
+    "upstream_requests_total", "PostgREST calls", ("method", "table", "shape", "status")
+)
+upstream_duration = registry.histogram(
+    "upstream_request_duration_seconds", "PostgREST call latency (until headers + body)", ("method", "table", "shape")
+)
+upstream_decode = registry.histogram(
+    "upstream_decode_seconds", "JSON decode time of PostgREST responses", ("table",)
+)
+upstream_retries = registry.counter(
+    "upstream_retries_total", "PostgREST calls retried after a transient failure", ("method",)
+)
+upstream_shed = registry.counter(
+    "upstream_shed_total", "PostgREST calls refused locally", ("reason",)
+)
+stale_reads = registry.counter(
+    "stale_reads_total", "Reads served from stale cache while Supabase was unavailable", ("kind",)
+)
+serialize_duration = registry.histogram(
+    "response_serialize_seconds", "Response body serialization time", ("route",)
+)
+
+
+# ============ PER-REQUEST TIMINGS ============
+class RequestTimings:
+    """What one HTTP request spent, filled in as it runs"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.calls: list = []  # (label, seconds, decode seconds)
+        self.serialize = 0.0
+
+    @property
+    def upstream(self) -> float:
+        return sum(seconds for _, seconds, _ in self.calls)
+
+    @property
+    def decode(self) -> float:
+        return sum(decode for _, _, decode in self.calls)
+
+    def server_timing(self, total: float) -> str:
+        parts = [
+            f'db;desc="{len(self.calls)} calls";dur={self.upstream * 1000:.1f}',
+            f"decode;dur={self.decode * 1000:.1f}",
+            f"serialize;dur={self.serialize * 1000:.1f}",
+            f"total;dur={total * 1000:.1f}"
+        ]
+        return ", ".join(parts)
+
+
+_current: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
+
+
+def current() -> Optional[RequestTimings]:
+    return _current.get()
+
+
+@contextmanager
+def request_timings() -> Iterator[RequestTimings]:
+    """Timings of the current request, starting one if nothing tracks it yet"""
+    timings = _current.get()
+    if timings is not None:
+        yield timings
+        return
+    timings = RequestTimings()
+    token = _current.set(timings)
+    try:
+        yield timings
+    finally:
+        _current.reset(token)
+
+
+def record_upstream(method: str, table: str, shape: str, status: object, seconds: float, decode: float = 0.0):
+    """One PostgREST call (called by the query layer)"""
+    upstream_requests.inc(method, table, shape, status)
+    upstream_duration.observe(seconds, method, table, shape)
+    if decode:
+        upstream_decode.observe(decode, table)
+    timings = _current.get()
+    if timings is not None:
+        timings.calls.append((f"{method} {table} {shape}", seconds, decode))
+
+
+@contextmanager
+def timed_serialize() -> Iterator[None]:
+    """Count a block as serialization time for the current request"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        timings = _current.get()
+        if timings is not None:
+            timings.serialize += elapsed
+
+
+# ============ MIDDLEWARE ============
+class MetricsMiddleware:
+    """ASGI middleware: timings contextvar, Server-Timing header, metrics, slow log"""
+
+    def __init__(self, app, slow_ms: float = 500.0, server_timing: bool = True):
+        self.app = app
+        self.slow_ms = slow_ms
+        self.server_timing = server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings()
+        token = _current.set(timings)
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if self.server_timing:
+                    total = time.perf_counter() - timings.started
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", timings.server_timing(total).encode()))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            self._record(scope, status, timings)
+
+    def _record(self, scope, status: int, timings: RequestTimings):
+        total = time.perf_counter() - timings.started
+        route = getattr(scope.get("route"), "path", None) or "unmatched"
+        method = scope["method"]
+
+        http_requests.inc(method, route, status)
+        http_duration.observe(total, method, route)
+        http_upstream_calls.observe(len(timings.calls), route)
+        if timings.serialize:
+            serialize_duration.observe(timings.serialize, route)
+
+        if total * 1000 >= self.slow_ms:
+            logger.warning(json.dumps({
+                "event": "slow_request",
+                "method": method,
+                "route": route,
+                "status": status,
+                "duration_ms": round(total * 1000, 1),
+                "upstream_calls": len(timings.calls),
+                "upstream_ms": round(timings.upstream * 1000, 1),
+                "decode_ms": round(timings.decode * 1000, 1),
+                "serialize_ms": round(timings.serialize * 1000, 1),
+                "calls": [
+                    {"call": label, "ms": round(seconds * 1000, 1)} for label, seconds, _ in timings.calls
+                ]
+            }))
@@ -1,10 +1,13 @@
-from pydantic import BaseModel, Field, field_validator
-from typing import Optional, Literal
+from pydantic import BaseModel, Field, TypeAdapter, field_validator
+from typing import Annotated, Any, Optional, Literal, Union
 from datetime import date, datetime
 from uuid import UUID
 from enum import Enum
 import re
 
+# Compiled once (not per request)
+EMAIL_PATTERN = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+
 
 # ============ ENUMS ============
 class RoleEnum(str, Enum):
@@ -13,8 +16,24 @@ class RoleEnum(str, Enum):
     INSTITUTION = "institution"
 
 
+class CountStrategy(str, Enum):
+    """How list totals are counted (PostgREST Prefer: count=...)"""
+    EXACT = "exact"
+    PLANNED = "planned"
+    ESTIMATED = "estimated"
+    NONE = "none"  # no count, only has_more
+
+
 # ============ REQUEST MODELS ============
-class ProfileCreate(BaseModel):
+class RowModel(BaseModel):
+    """Request body that becomes a PostgREST row"""
+    
+    def to_row(self) -> dict:
+        """JSON-ready row in one pass (dates -> ISO strings, enums -> values, no None)"""
+        return self.model_dump(mode="json", exclude_none=True)
+
+
+class ProfileCreate(RowModel):
     """Naya profile banane ke liye"""
     full_name: str = Field(..., min_length=2, max_length=100, examples=["Rahul Sharma"])
     email: str = Field(..., examples=["rahul@example.com"])
@@ -32,13 +51,12 @@ class ProfileCreate(BaseModel):
     @field_validator('email')
     @classmethod
     def validate_email(cls, v):
-        email_regex = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-        if not re.match(email_regex, v):
+        if not EMAIL_PATTERN.match(v):
             raise ValueError('Invalid email format')
         return v.lower()
 
 
-class ProfileUpdate(BaseModel):
+class ProfileUpdate(RowModel):
     """Profile update karne ke liye"""
     full_name: Optional[str] = Field(None, min_length=2, max_length=100)
     phone: Optional[str] = Field(None, max_length=15)
@@ -53,6 +71,18 @@ class ProfileUpdate(BaseModel):
     role: Optional[RoleEnum] = Field(None, examples=["user", "institution"])  # NEW FIELD
 
 
+class ProfileBatchGet(BaseModel):
+    """Ek saath kai profiles fetch karne ke liye"""
+    ids: list[UUID] = Field(..., min_length=1, max_length=500)
+
+
+# Shared adapters for array payloads (bulk import) - built once.
+# Rows that fail ProfileCreate come back as given (left to right union),
+# so one pass validates a chunk and only bad rows are looked at again.
+PROFILE_CREATE_ROWS = TypeAdapter(list[Annotated[Union[ProfileCreate, Any], Field(union_mode="left_to_right")]])
+PROFILE_CREATE_LIST = TypeAdapter(list[ProfileCreate])
+
+
 # ============ RESPONSE MODELS ============
 class ProfileResponse(BaseModel):
     """Single profile response"""
@@ -83,14 +113,23 @@ class APIResponse(BaseModel):
     data: Optional[dict | list] = None
 
 
+class SearchResponse(APIResponse):
+    """Search results with continuation"""
+    mode: str
+    next_cursor: Optional[str] = None
+
+
 class PaginatedResponse(BaseModel):
     """Paginated response"""
     success: bool
     message: str
     data: list
-    total: int
+    total: Optional[int] = None  # None in cursor / count=none mode
+    total_is_exact: bool = True
+    has_more: Optional[bool] = None
     page: int
     limit: int
+    next_cursor: Optional[str] = None
 
 
 # ============ ROLE STATS ============
@@ -98,4 +137,8 @@ class RoleStats(BaseModel):
     """Role wise count"""
     total_users: int
     total_institutions: int
-    total_profiles: int
\ No newline at end of file
+    total_profiles: int
+    total_active: int = 0
+    total_inactive: int = 0
+    by_city: dict[str, int] = {}
+    by_country: dict[str, int] = {}
\ No newline at end of file
@@ -0,0 +1,168 @@
+"""Retry, circuit breaker and concurrency limit primitives
+
+Kept free of app imports. AsyncSupabaseClient wires the upstream ones
+together and turns refusals into UpstreamUnavailableError (503 +
+Retry-After); AIMDLimit drives the API edge limits in app/admission.py.
+"""
+import asyncio
+import random
+import threading
+import time
+from typing import Optional
+
+
+class RetryPolicy:
+    """Bounded retries with full-jitter exponential backoff"""
+
+    def __init__(self, attempts: int = 2, base_delay: float = 0.05, max_delay: float = 1.0):
+        self.attempts = attempts  # retries after the first try
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt: int) -> float:
+        """Sleep before retry number `attempt` (0-based)"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+
+class CircuitBreaker:
+    """Opens after `failure_threshold` consecutive failures
+
+    While open, calls are refused for `reset_timeout` seconds; then one
+    probe call is let through (half-open) and its outcome closes or
+    re-opens the circuit.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 10.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.opens = 0
+        self.rejected = 0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> Optional[float]:
+        """None if the call may go ahead, else seconds until it is worth retrying"""
+        with self._lock:
+            if self.state == self.OPEN:
+                remaining = self.opened_at + self.reset_timeout - time.monotonic()
+                if remaining > 0:
+                    self.rejected += 1
+                    return remaining
+                self.state = self.HALF_OPEN
+                self._probing = False
+            if self.state == self.HALF_OPEN:
+                if self._probing:
+                    self.rejected += 1
+                    return self.reset_timeout
+                self._probing = True
+            return None
+
+    def record(self, success: Optional[bool]):
+        """Outcome of an allowed call (None = abandoned, e.g. cancelled)"""
+        with self._lock:
+            if success is None:
+                self._probing = False
+            elif success:
+                self.state = self.CLOSED
+                self.failures = 0
+                self._probing = False
+            elif self.state == self.HALF_OPEN:
+                self._open()
+            else:
+                self.failures += 1
+                if self.failures >= self.failure_threshold:
+                    self._open()
+
+    def _open(self):
+        self.state = self.OPEN
+        self.opened_at = time.monotonic()
+        self.opens += 1
+        self._probing = False
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "opens": self.opens,
+            "rejected": self.rejected
+        }
+
+
+class ConcurrencyLimiter:
+    """At most `limit` calls in flight; waiting longer than `timeout` fails"""
+
+    def __init__(self, limit: int = 50, timeout: float = 2.0):
+        self.limit = limit
+        self.timeout = timeout
+        self._semaphore = asyncio.Semaphore(limit)
+        self.waiting = 0
+        self.timeouts = 0
+
+    async def acquire(self) -> bool:
+        if not self._semaphore.locked():
+            await self._semaphore.acquire()
+            return True
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.timeout)
+            return True
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            return False
+        finally:
+            self.waiting -= 1
+
+    def release(self):
+        self._semaphore.release()
+
+    def stats(self) -> dict:
+        return {
+            "limit": self.limit,
+            "waiting": self.waiting,
+            "timeouts": self.timeouts
+        }
+
+
+class AIMDLimit:
+    """Concurrency limit that adapts to latency (additive increase, multiplicative decrease)
+
+    A sample slower than `target` (or an overload signal) shrinks the
+    limit by `backoff`, at most once per round trip; fast samples while
+    the limit is actually in use grow it by ~1 per `limit` requests.
+    """
+
+    def __init__(
+        self,
+        initial: float,
+        min_limit: float = 1,
+        max_limit: float = 1000,
+        target: float = 0.1,
+        backoff: float = 0.9
+    ):
+        self.value = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.target = target
+        self.backoff = backoff
+        self._last_drop = 0.0
+
+    @property
+    def limit(self) -> int:
+        return max(1, int(self.value))
+
+    def sample(self, started: float, latency: float, in_flight: int, overloaded: bool = False):
+        """One finished request (`started` on the time.monotonic() clock)"""
+        if overloaded or latency > self.target:
+            # Requests already running when we last backed off say nothing new
+            if started > self._last_drop:
+                self.value = max(self.min_limit, self.value * self.backoff)
+                self._last_drop = time.monotonic()
+        elif in_flight * 2 >= self.value:
+            self.value = min(self.max_limit, self.value + 1 / self.value)
@@ -1,201 +1,444 @@
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, Header, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from app.models import (
     ProfileCreate, 
     ProfileUpdate, 
+    ProfileBatchGet,
     APIResponse, 
     PaginatedResponse,
+    SearchResponse,
     RoleEnum,
     RoleStats
 )
-from app.services.profile_service import profile_service
+from app.config import get_settings
+from app.services.profile_service import get_profile_service
+from app.services.pagination import InvalidCursorError
+from app.services.fields import InvalidFieldsError, parse_fields, project, select_columns
+from app import http_cache
+from app.serialization import respond
+from app.database import UniqueViolationError
 from uuid import UUID
 from typing import Optional
 
 router = APIRouter(prefix="/profiles", tags=["Profiles"])
 
+CURSOR_DESCRIPTION = "Keyset mode: empty for first page, then pass next_cursor (page is ignored)"
+FIELDS_DESCRIPTION = "Comma separated columns (e.g. id,full_name,email) or 'summary' (id, full_name, avatar_url, role)"
+
+
+def _parse_fields(fields: Optional[str]) -> Optional[tuple]:
+    """?fields= -> column tuple (400 on unknown columns)"""
+    try:
+        return parse_fields(fields)
+    except InvalidFieldsError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _cache_policy(name: str) -> str:
+    """Cache-Control for a route group (settings.cache_control)"""
+    return get_settings().cache_control.get(name, "no-cache")
+
+
+def _list_response(request: Request, payload: PaginatedResponse) -> Response:
+    """List page with a body-hash ETag only
+
+    No Last-Modified: a row deleted from (or moved out of) the page leaves
+    the newest updated_at where it was, so If-Modified-Since would 304.
+    """
+    return http_cache.cached_json(request, payload, _cache_policy("list"))
+
+
+async def _cursor_page(
+    request: Request,
+    label: str,
+    cursor: str,
+    limit: int,
+    is_active: Optional[bool] = None,
+    role: Optional[str] = None,
+    fields: Optional[tuple] = None
+) -> Response:
+    """Keyset (cursor) page - shared by the list endpoints"""
+    profile_service = get_profile_service()
+    try:
+        rows, next_cursor = await profile_service.get_profiles_after(
+            cursor, limit, is_active, role, select_columns(fields, ("created_at", "id"))
+        )
+    except InvalidCursorError:
+        raise HTTPException(status_code=400, detail="Invalid cursor!")
+    profiles = [project(row, fields) for row in rows]
+    
+    return _list_response(request, PaginatedResponse(
+        success=True,
+        message=f"Found {len(profiles)} {label}",
+        data=profiles,
+        total_is_exact=False,
+        has_more=next_cursor is not None,
+        page=1,
+        limit=limit,
+        next_cursor=next_cursor
+    ))
+
+
+def _page_response(request: Request, label: str, result, page: int, limit: int) -> Response:
+    return _list_response(request, PaginatedResponse(
+        success=True,
+        message=f"Found {len(result.rows)} {label}",
+        data=result.rows,
+        total=result.total,
+        total_is_exact=result.total_is_exact,
+        has_more=result.has_more,
+        page=page,
+        limit=limit
+    ))
+
 
 # ============ CREATE ============
 @router.post("/", response_model=APIResponse, status_code=201)
-def create_profile(profile: ProfileCreate):
+async def create_profile(profile: ProfileCreate):
     """
     ✨ Naya profile banao
     
     - **role**: 'user' ya 'institution' (default: user)
     """
-    existing = profile_service.get_profile_by_email(profile.email)
-    if existing:
-        raise HTTPException(status_code=400, detail="Email already exists!")
-    
-    new_profile = profile_service.create_profile(profile)
+    profile_service = get_profile_service()
+    # Single round trip - unique constraint catches duplicate emails
+    try:
+        new_profile = await profile_service.create_profile(profile)
+    except UniqueViolationError as e:
+        if "email" in f"{e.message} {e.details}":
+            raise HTTPException(status_code=400, detail="Email already exists!")
+        raise HTTPException(status_code=400, detail="Profile already exists!")
     
     if not new_profile:
         raise HTTPException(status_code=500, detail="Failed to create profile")
     
-    return APIResponse(
+    return respond(APIResponse(
         success=True,
         message=f"Profile created as {profile.role.value}!",
         data=new_profile
-    )
+    ), status_code=201)
+
+
+# ============ BULK IMPORT ============
+@router.post("/bulk", response_model=APIResponse)
+async def bulk_import_profiles(
+    request: Request,
+    batch_size: Optional[int] = Query(None, ge=1, le=5000, description="Rows per insert (default from settings)"),
+    upsert: bool = Query(False, description="Update existing emails instead of reporting them")
+):
+    """
+    📦 Bulk profile import
+    
+    Body: JSON array, NDJSON (application/x-ndjson) ya CSV (text/csv),
+    ya multipart upload with a 'file' field. Errors are reported per row.
+    """
+    from app.services import bulk  # csv / upload parsing, only for these routes
+    profile_service = get_profile_service()
+    batch_size = batch_size or profile_service.settings.bulk_batch_size
+    
+    try:
+        report = await bulk.import_profiles(
+            profile_service, bulk.iter_upload_rows(request), batch_size, upsert
+        )
+    except bulk.BulkFormatError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return respond(APIResponse(
+        success=report["failed"] == 0,
+        message=f"Saved {report['saved']} of {report['received']} profiles",
+        data=report
+    ))
+
+
+# ============ BATCH GET ============
+@router.post("/batch-get", response_model=APIResponse)
+async def batch_get_profiles(batch: ProfileBatchGet):
+    """
+    🧺 Kai profiles ek saath (up to 500 ids)
+    
+    Results request order mein; jo ids nahi mile woh `missing` mein
+    """
+    profile_service = get_profile_service()
+    profiles, missing = await profile_service.get_profiles_by_ids(batch.ids)
+    
+    return respond(APIResponse(
+        success=True,
+        message=f"Found {len(profiles)} of {len(profiles) + len(missing)} profiles",
+        data={"profiles": profiles, "missing": missing}
+    ))
 
 
 # ============ READ ALL ============
 @router.get("/", response_model=PaginatedResponse)
-def get_all_profiles(
+async def get_all_profiles(
+    request: Request,
     page: int = Query(1, ge=1),
     limit: int = Query(10, ge=1, le=100),
     is_active: Optional[bool] = None,
-    role: Optional[RoleEnum] = Query(None, description="Filter by role: user or institution")  # NEW
+    role: Optional[RoleEnum] = Query(None, description="Filter by role: user or institution"),  # NEW
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION)
 ):
     """
     📋 Saare profiles dekho with filters
     
     - **role**: Filter by 'user' or 'institution'
+    - **cursor**: Deep scrolling ke liye keyset pagination
+    - **fields**: Sirf chahiye woh columns (chhota payload)
     """
+    profile_service = get_profile_service()
     role_value = role.value if role else None
-    profiles, total = profile_service.get_all_profiles(page, limit, is_active, role_value)
+    columns = _parse_fields(fields)
+    if cursor is not None:
+        return await _cursor_page(request, "profiles", cursor, limit, is_active, role_value, columns)
     
-    return PaginatedResponse(
-        success=True,
-        message=f"Found {len(profiles)} profiles",
-        data=profiles,
-        total=total,
-        page=page,
-        limit=limit
-    )
+    result = await profile_service.get_all_profiles(page, limit, is_active, role_value, fields=columns)
+    
+    return _page_response(request, "profiles", result, page, limit)
 
 
 # ============ GET ONLY USERS ============
 @router.get("/users", response_model=PaginatedResponse)
-def get_all_users(
+async def get_all_users(
+    request: Request,
     page: int = Query(1, ge=1),
-    limit: int = Query(10, ge=1, le=100)
+    limit: int = Query(10, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION)
 ):
     """
     👤 Sirf Users dekho (role = 'user')
     """
-    profiles, total = profile_service.get_users(page, limit)
+    profile_service = get_profile_service()
+    columns = _parse_fields(fields)
+    if cursor is not None:
+        return await _cursor_page(request, "users", cursor, limit, role="user", fields=columns)
     
-    return PaginatedResponse(
-        success=True,
-        message=f"Found {len(profiles)} users",
-        data=profiles,
-        total=total,
-        page=page,
-        limit=limit
-    )
+    result = await profile_service.get_users(page, limit, columns)
+    
+    return _page_response(request, "users", result, page, limit)
 
 
 # ============ GET ONLY INSTITUTIONS ============
 @router.get("/institutions", response_model=PaginatedResponse)
-def get_all_institutions(
+async def get_all_institutions(
+    request: Request,
     page: int = Query(1, ge=1),
-    limit: int = Query(10, ge=1, le=100)
+    limit: int = Query(10, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION)
 ):
     """
     🏛️ Sirf Institutions dekho (role = 'institution')
     """
-    profiles, total = profile_service.get_institutions(page, limit)
+    profile_service = get_profile_service()
+    columns = _parse_fields(fields)
+    if cursor is not None:
+        return await _cursor_page(request, "institutions", cursor, limit, role="institution", fields=columns)
     
-    return PaginatedResponse(
-        success=True,
-        message=f"Found {len(profiles)} institutions",
-        data=profiles,
-        total=total,
-        page=page,
-        limit=limit
-    )
+    result = await profile_service.get_institutions(page, limit, columns)
+    
+    return _page_response(request, "institutions", result, page, limit)
 
 
 # ============ ROLE STATS ============
 @router.get("/stats/roles", response_model=APIResponse)
-def get_role_statistics():
+async def get_role_statistics(request: Request):
     """
     📊 Role wise statistics
     
-    Returns count of users and institutions
+    Returns count of users and institutions, plus active / city / country
+    breakdown (served from memory, reconciled in the background)
     """
-    stats = profile_service.get_role_stats()
+    profile_service = get_profile_service()
+    stats = await profile_service.get_role_stats()
     
-    return APIResponse(
+    return http_cache.cached_json(request, APIResponse(
         success=True,
         message="Role statistics fetched!",
         data=stats
-    )
+    ), _cache_policy("stats"))
+
+
+# ============ CACHE STATS ============
+@router.get("/stats/cache", response_model=APIResponse)
+async def get_cache_statistics():
+    """
+    📈 Profile cache statistics (hit ratio, evictions)
+    """
+    profile_service = get_profile_service()
+    return respond(APIResponse(
+        success=True,
+        message="Cache statistics fetched!",
+        data=profile_service.get_cache_stats()
+    ))
 
 
 # ============ SEARCH ============
-@router.get("/search/", response_model=APIResponse)
-def search_profiles(
+@router.get("/search/", response_model=SearchResponse)
+async def search_profiles(
     q: str = Query(..., min_length=2),
     limit: int = Query(10, ge=1, le=50),
-    role: Optional[RoleEnum] = Query(None, description="Filter by role")  # NEW
+    role: Optional[RoleEnum] = Query(None, description="Filter by role"),  # NEW
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    mode: Optional[str] = Query(None, pattern="^(ilike|fts)$", description="Override the configured search mode"),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION)
 ):
     """
     🔍 Profile search karo
     
     - **role**: Optionally filter by role
+    - **mode**: 'fts' = ranked full-text, 'ilike' = substring match
+    - **fields**: Sirf chahiye woh columns (e.g. 'summary')
     """
+    profile_service = get_profile_service()
     role_value = role.value if role else None
-    profiles = profile_service.search_profiles(q, limit, role_value)
+    mode = mode or profile_service.settings.search_mode
+    columns = _parse_fields(fields)
+    try:
+        profiles, next_cursor = await profile_service.search_profiles(q, limit, role_value, cursor, mode, columns)
+    except InvalidCursorError:
+        raise HTTPException(status_code=400, detail="Invalid cursor!")
     
-    return APIResponse(
+    return respond(SearchResponse(
         success=True,
         message=f"Found {len(profiles)} profiles",
-        data=profiles
+        data=profiles,
+        mode=mode,
+        next_cursor=next_cursor
+    ))
+
+
+# ============ AUTOCOMPLETE ============
+@router.get("/autocomplete", response_model=APIResponse)
+async def autocomplete_profiles(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(10, ge=1, le=50),
+    role: Optional[RoleEnum] = Query(None, description="Filter by role")
+):
+    """
+    ⚡ Naam / email prefix suggestions (in-memory index)
+    """
+    profile_service = get_profile_service()
+    suggestions = await profile_service.autocomplete_profiles(q, limit, role.value if role else None)
+    
+    return respond(APIResponse(
+        success=True,
+        message=f"Found {len(suggestions)} suggestions",
+        data=suggestions
+    ))
+
+
+# ============ EXPORT ============
+@router.get("/export")
+async def export_profiles(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    is_active: Optional[bool] = None,
+    role: Optional[RoleEnum] = Query(None, description="Filter by role")
+):
+    """
+    📤 Saare profiles export karo (NDJSON ya CSV, streamed)
+    """
+    from app.services import bulk  # csv / upload parsing, only for these routes
+    profile_service = get_profile_service()
+    rows = profile_service.iter_profiles(
+        is_active, role.value if role else None, profile_service.settings.export_page_size
+    )
+    
+    if format == "csv":
+        body, media_type = bulk.export_csv(rows), "text/csv"
+    else:
+        body, media_type = bulk.export_ndjson(rows), "application/x-ndjson"
+    
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename=profiles.{format}"}
     )
 
 
 # ============ GET SINGLE ============
 @router.get("/{profile_id}", response_model=APIResponse)
-def get_profile(profile_id: UUID):
+async def get_profile(
+    request: Request,
+    profile_id: UUID,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION)
+):
     """
     👤 Ek specific profile dekho
+    
+    ETag / If-None-Match support - unchanged profile pe empty 304
     """
-    profile = profile_service.get_profile_by_id(profile_id)
+    profile_service = get_profile_service()
+    columns = _parse_fields(fields)
+    profile = await profile_service.get_profile_by_id(profile_id, columns)
     
     if not profile:
         raise HTTPException(status_code=404, detail="Profile not found!")
     
-    return APIResponse(
-        success=True,
-        message="Profile found!",
-        data=profile
+    # Queued write-behind fields change the row without moving updated_at
+    write_token = profile_service.write_token(profile_id)
+    return http_cache.cached_json(
+        request,
+        APIResponse(success=True, message="Profile found!", data=project(profile, columns)),
+        _cache_policy("profile"),
+        etag=http_cache.profile_etag(profile, write_token),
+        last_modified=None if write_token else http_cache.parse_timestamp(profile.get("updated_at"))
     )
 
 
 # ============ UPDATE ============
 @router.put("/{profile_id}", response_model=APIResponse)
-def update_profile(profile_id: UUID, profile_update: ProfileUpdate):
+async def update_profile(
+    profile_id: UUID,
+    profile_update: ProfileUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None, description="ETag from GET - optimistic concurrency")
+):
     """
     ✏️ Profile update karo (including role)
+    
+    - **If-Match**: sirf tab update jab profile GET ke baad change na hua ho (else 412)
     """
-    existing = profile_service.get_profile_by_id(profile_id)
-    if not existing:
-        raise HTTPException(status_code=404, detail="Profile not found!")
+    profile_service = get_profile_service()
+    expected_updated_at = expected_write = None
+    if if_match and if_match.strip() != "*":
+        parsed = http_cache.parse_profile_etag(if_match)
+        if parsed is None or parsed[0] != str(profile_id):
+            raise HTTPException(status_code=412, detail="ETag does not match this profile!")
+        _, expected_updated_at, expected_write = parsed
     
-    updated_profile = profile_service.update_profile(profile_id, profile_update)
+    updated_profile = await profile_service.update_profile(
+        profile_id, profile_update, expected_updated_at=expected_updated_at, expected_write=expected_write
+    )
     
-    return APIResponse(
+    # Empty PATCH result = no such row (or If-Match lost the race)
+    if not updated_profile:
+        if expected_updated_at and await profile_service.get_profile_by_id(profile_id):
+            raise HTTPException(status_code=412, detail="Profile was modified, fetch it again!")
+        raise HTTPException(status_code=404, detail="Profile not found!")
+    
+    headers = {"ETag": http_cache.profile_etag(updated_profile, profile_service.write_token(profile_id))}
+    response.headers.update(headers)
+    return respond(APIResponse(
         success=True,
         message="Profile updated!",
         data=updated_profile
-    )
+    ), headers=headers)
 
 
 # ============ DELETE ============
 @router.delete("/{profile_id}", response_model=APIResponse)
-def delete_profile(profile_id: UUID):
+async def delete_profile(profile_id: UUID):
     """
     🗑️ Profile delete karo
     """
-    existing = profile_service.get_profile_by_id(profile_id)
-    if not existing:
-        raise HTTPException(status_code=404, detail="Profile not found!")
-    
-    deleted = profile_service.delete_profile(profile_id)
+    profile_service = get_profile_service()
+    deleted = await profile_service.delete_profile(profile_id)
     
+    # Empty DELETE result = no such row
     if not deleted:
-        raise HTTPException(status_code=500, detail="Failed to delete!")
+        raise HTTPException(status_code=404, detail="Profile not found!")
     
     return APIResponse(
         success=True,
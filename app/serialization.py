@@ -0,0 +1,67 @@
+"""Fast JSON response path (settings.fast_json)
+
+Rows from PostgREST are already JSON-shaped, so the response envelope is
+serialized once as-is - no response_model re-validation, no
+jsonable_encoder walk. Uses orjson when installed, else pydantic-core's
+serializer. See benchmarks/bench_serialization.py.
+"""
+from typing import Any, Optional
+from fastapi import Response
+from pydantic import BaseModel, TypeAdapter
+from app import metrics
+from app.config import get_settings
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+_ANY = TypeAdapter(Any)
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    """JSON bytes for plain data (dicts / lists / UUID / datetime / models)"""
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return _ANY.dump_json(content)
+
+
+def envelope(payload: BaseModel) -> dict:
+    """Model fields as a shallow dict - rows inside are not walked again"""
+    return {name: getattr(payload, name) for name in type(payload).model_fields}
+
+
+def render(payload: BaseModel) -> bytes:
+    """Response body for an APIResponse-style model"""
+    with metrics.timed_serialize():
+        if get_settings().fast_json:
+            return dumps(envelope(payload))
+        return payload.model_dump_json().encode()
+
+
+class FastJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        with metrics.timed_serialize():
+            if isinstance(content, BaseModel):
+                content = envelope(content)
+            return dumps(content)
+
+
+def respond(payload: BaseModel, status_code: int = 200, headers: Optional[dict] = None) -> Any:
+    """Route return value: the model itself (FastAPI validates it against
+    response_model) or, with fast_json on, a pre-serialized response
+
+    headers only apply to the fast path - routes also set them on their
+    injected Response for the model path.
+    """
+    if get_settings().fast_json:
+        return FastJSONResponse(payload, status_code=status_code, headers=headers)
+    return payload
@@ -0,0 +1,256 @@
+import asyncio
+import codecs
+import csv
+import io
+import itertools
+import json
+from typing import Any, AsyncIterator, Iterable, Optional
+from fastapi import Request
+from pydantic import ValidationError
+from app.models import PROFILE_CREATE_ROWS, ProfileCreate, ProfileResponse
+
+# Errors beyond this are only counted, not listed
+MAX_REPORTED_ERRORS = 1000
+
+EXPORT_COLUMNS = list(ProfileResponse.model_fields)
+
+
+class BulkFormatError(ValueError):
+    """Upload format could not be understood"""
+
+
+class UndecodableRow:
+    """NDJSON line that is not valid UTF-8 (reported per row)"""
+
+
+def detect_format(content_type: Optional[str], filename: Optional[str] = None) -> str:
+    """json | ndjson | csv from content type (or file extension)"""
+    content_type = (content_type or "").split(";")[0].strip().lower()
+    name = (filename or "").lower()
+
+    if content_type in ("application/x-ndjson", "application/ndjson", "application/jsonl") \
+            or name.endswith((".ndjson", ".jsonl")):
+        return "ndjson"
+    if content_type in ("text/csv", "application/csv") or name.endswith(".csv"):
+        return "csv"
+    if content_type in ("application/json", "") or name.endswith(".json"):
+        return "json"
+    raise BulkFormatError(f"Unsupported upload type: {content_type or filename}")
+
+
+# ============ PARSING ============
+def _clean_csv_row(row: dict) -> dict:
+    """Empty CSV cells -> missing (so model defaults apply)"""
+    return {key: value for key, value in row.items() if key and value not in (None, "")}
+
+
+def _parse_line(line: str) -> Any:
+    try:
+        return json.loads(line)
+    except ValueError:
+        return line  # reported per row by validation
+
+
+def _iter_text_rows(text: Iterable[str], fmt: str) -> Iterable[Any]:
+    if fmt == "csv":
+        for row in csv.DictReader(text):
+            yield _clean_csv_row(row)
+    elif fmt == "ndjson":
+        for line in text:
+            if line.strip():
+                yield _parse_line(line)
+    else:
+        data = json.loads("".join(text))
+        if not isinstance(data, list):
+            raise BulkFormatError("JSON body must be an array of profiles")
+        yield from data
+
+
+def _text_rows(text: Iterable[str], fmt: str) -> Iterable[Any]:
+    """_iter_text_rows with decoding problems as BulkFormatError (400)"""
+    try:
+        yield from _iter_text_rows(text, fmt)
+    except UnicodeDecodeError:
+        raise BulkFormatError("Upload is not valid UTF-8")
+    except json.JSONDecodeError:
+        raise BulkFormatError("Invalid JSON body")
+
+
+async def _iter_in_thread(rows: Iterable[Any], size: int = 500) -> AsyncIterator[Any]:
+    """Drain a blocking iterator (file reads, decoding) off the event loop"""
+    iterator = iter(rows)
+    while True:
+        block = await asyncio.to_thread(lambda: list(itertools.islice(iterator, size)))
+        if not block:
+            return
+        for row in block:
+            yield row
+
+
+async def _iter_upload(upload: Any, size: int = 65536) -> AsyncIterator[bytes]:
+    """Chunks of a multipart file (UploadFile.read runs in a thread once spooled to disk)"""
+    while chunk := await upload.read(size):
+        yield chunk
+
+
+def _ndjson_row(line: bytes) -> Any:
+    try:
+        text = line.decode("utf-8")
+    except UnicodeDecodeError:
+        return UndecodableRow()
+    return _parse_line(text) if text.strip() else None
+
+
+async def _iter_ndjson(chunks: AsyncIterator[bytes]) -> AsyncIterator[Any]:
+    """Rows from a byte stream, line by line, without buffering the whole body"""
+    buffer = b""
+    started = False
+    async for chunk in chunks:
+        buffer += chunk
+        if not started:
+            buffer = buffer.removeprefix(codecs.BOM_UTF8)
+            started = True
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            row = _ndjson_row(line)
+            if row is not None:
+                yield row
+    row = _ndjson_row(buffer)
+    if row is not None:
+        yield row
+
+
+async def iter_upload_rows(request: Request) -> AsyncIterator[Any]:
+    """Raw rows from a JSON array, NDJSON or CSV body, or a multipart 'file'"""
+    content_type = request.headers.get("content-type", "")
+
+    if content_type.startswith("multipart/form-data"):
+        form = await request.form()
+        upload = form.get("file")
+        if upload is None or isinstance(upload, str):
+            raise BulkFormatError("Multipart upload needs a 'file' field")
+        fmt = detect_format(upload.content_type, upload.filename)
+        if fmt == "ndjson":
+            async for row in _iter_ndjson(_iter_upload(upload)):
+                yield row
+            return
+        text = io.TextIOWrapper(upload.file, encoding="utf-8-sig", newline="")
+        async for row in _iter_in_thread(_text_rows(text, fmt)):
+            yield row
+        return
+
+    fmt = detect_format(content_type)
+    if fmt == "ndjson":
+        # Streamed line by line - memory stays flat for big uploads
+        async for row in _iter_ndjson(request.stream()):
+            yield row
+        return
+
+    try:
+        body = (await request.body()).decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise BulkFormatError("Upload is not valid UTF-8")
+    for row in _text_rows(io.StringIO(body, newline=""), fmt):
+        yield row
+
+
+async def chunked(rows: AsyncIterator[Any], size: int) -> AsyncIterator[list]:
+    chunk = []
+    async for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+# ============ IMPORT ============
+def validate_chunk(rows: list, start: int) -> tuple[list, list]:
+    """Validate against ProfileCreate -> ([(index, profile)], [error])
+
+    One pass over the chunk (shared adapter); only rows that failed are
+    validated again, for their error messages.
+    """
+    valid, errors = [], []
+    for index, item in enumerate(PROFILE_CREATE_ROWS.validate_python(rows), start):
+        if isinstance(item, ProfileCreate):
+            valid.append((index, item))
+            continue
+        if isinstance(item, UndecodableRow):
+            errors.append({"index": index, "error": "row: Line is not valid UTF-8"})
+            continue
+        try:
+            valid.append((index, ProfileCreate.model_validate(item)))
+        except ValidationError as e:
+            message = "; ".join(
+                f"{'.'.join(str(part) for part in err['loc']) or 'row'}: {err['msg']}"
+                for err in e.errors()
+            )
+            errors.append({"index": index, "error": message})
+    return valid, errors
+
+
+async def import_profiles(service: Any, rows: AsyncIterator[Any], batch_size: int, upsert: bool = False) -> dict:
+    """Validate in chunks and insert in batches; returns a per-row error report"""
+    seen_emails = set()
+    received = saved = failed = 0
+    errors = []
+
+    def report(batch_errors: list):
+        nonlocal failed
+        failed += len(batch_errors)
+        room = MAX_REPORTED_ERRORS - len(errors)
+        if room > 0:
+            errors.extend(batch_errors[:room])
+
+    async for chunk in chunked(rows, batch_size):
+        valid, batch_errors = validate_chunk(chunk, received)
+        received += len(chunk)
+
+        # Same email twice in one upload - keep the first
+        batch = []
+        for index, profile in valid:
+            if profile.email in seen_emails:
+                batch_errors.append({"index": index, "email": profile.email, "error": "Duplicate email in upload"})
+                continue
+            seen_emails.add(profile.email)
+            batch.append((index, profile))
+
+        if batch:
+            saved_rows, insert_errors = await service.bulk_create_profiles(batch, upsert=upsert)
+            saved += len(saved_rows)
+            batch_errors.extend(insert_errors)
+
+        report(sorted(batch_errors, key=lambda err: err["index"]))
+
+    return {
+        "received": received,
+        "saved": saved,
+        "failed": failed,
+        "errors": errors
+    }
+
+
+# ============ EXPORT ============
+async def export_ndjson(rows: AsyncIterator[dict]) -> AsyncIterator[bytes]:
+    async for row in rows:
+        yield (json.dumps(row, default=str) + "\n").encode()
+
+
+async def export_csv(rows: AsyncIterator[dict], flush_every: int = 200) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS, extrasaction="ignore")
+    writer.writeheader()
+    pending = 0
+
+    async for row in rows:
+        writer.writerow(row)
+        pending += 1
+        if pending >= flush_every:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+
+    yield buffer.getvalue().encode()
@@ -0,0 +1,433 @@
+"""Profile change feed: tail table changes, fan them out to in-process state
+
+ProfileService only sees its own writes. Rows changed by other workers
+(or edited straight in Supabase) would leave this process's cache, stats
+and autocomplete index stale until a TTL or reconcile caught up. The
+ChangeFeed reads ordered batches of ChangeEvents from a ChangeSource,
+hands each batch to every subscriber in registration order, then saves
+the source position as a checkpoint. Delivery is at least once:
+subscribers must be idempotent.
+
+Sources:
+- PollingChangeSource: keyset over (updated_at, id) after the watermark,
+  plus delete tombstones from sql/profile_changes.sql
+- anything else implementing ChangeSource (Supabase Realtime, logical
+  replication) - start_position() / read() only
+"""
+import asyncio
+import json
+import logging
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Optional
+from app import metrics
+from app.filters import col
+
+logger = logging.getLogger(__name__)
+
+change_events = metrics.registry.counter(
+    "change_feed_events_total", "Change events delivered to subscribers", ("kind", "origin")
+)
+change_lag = metrics.registry.histogram(
+    "change_feed_lag_seconds", "Row change to delivery, newest event per batch", (),
+    buckets=(0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+)
+
+
+def parse_timestamp(value: str) -> datetime:
+    """PostgREST timestamptz text -> aware datetime (fraction width varies)"""
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+class ChangeEvent:
+    """insert / update (row = new row) or delete (row = last row, may be only the id)"""
+
+    def __init__(self, kind: str, profile_id: Any, row: dict, changed_at: str):
+        self.kind = kind
+        self.profile_id = str(profile_id)
+        self.row = row
+        self.changed_at = changed_at
+        # Echo of a write this process made itself (already applied locally)
+        self.local = False
+
+
+# ============ SOURCES ============
+class ChangeSource:
+    """Ordered profile changes, resumable from a position
+
+    Positions are JSON-able dicts, opaque to everyone but the source. A
+    push source fits the same shape: read() waits on its own queue and
+    the position is the replication LSN / message offset.
+    """
+
+    async def start_position(self) -> dict:
+        """Position of "now" - where a feed without a checkpoint starts"""
+        raise NotImplementedError
+
+    async def read(self, position: dict) -> tuple[list, dict, bool]:
+        """Next batch after position -> (events, position after them, more waiting)"""
+        raise NotImplementedError
+
+
+class PollingChangeSource(ChangeSource):
+    """Polls rows with (updated_at, id) past the watermark, oldest first
+
+    updated_at is stamped when a transaction starts, so a slow one can
+    commit a row older than rows already read. Rows younger than `settle`
+    seconds are left for a later poll to give such commits time to land.
+    Deletes leave no row behind: they are read from `deletions_table`
+    (sql/profile_changes.sql) when set, otherwise only our own deletes
+    are seen.
+    """
+
+    def __init__(
+        self,
+        client: Any,
+        table: str = "profiles",
+        deletions_table: str = "",
+        batch_size: int = 500,
+        settle: float = 2.0
+    ):
+        self.client = client
+        self.table = table
+        self.deletions_table = deletions_table
+        self.batch_size = batch_size
+        self.settle = settle
+
+    async def _head(self, table: str, column: str) -> Optional[list]:
+        response = await self.client.from_(table)\
+            .select(f"id,{column}")\
+            .order(column, desc=True)\
+            .order("id", desc=True)\
+            .limit(1)\
+            .execute()
+        if not response.data:
+            return None
+        row = response.data[0]
+        return [row[column], str(row["id"])]
+
+    async def _scan(self, table: str, column: str, after: Optional[list]) -> list:
+        """Settled rows after the (timestamp, id) watermark"""
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=self.settle)
+        query = self.client.from_(table)\
+            .select("*")\
+            .lt(column, cutoff.strftime("%Y-%m-%dT%H:%M:%S.%f+00:00"))
+        if after is not None:
+            stamp, last_id = after
+            query = query.where(col(column).gt(stamp) | (col(column).eq(stamp) & col("id").gt(last_id)))
+        response = await query\
+            .order(column)\
+            .order("id")\
+            .limit(self.batch_size)\
+            .execute()
+        return response.data
+
+    async def start_position(self) -> dict:
+        position = {"rows": await self._head(self.table, "updated_at")}
+        if self.deletions_table:
+            position["deletions"] = await self._head(self.deletions_table, "deleted_at")
+        return position
+
+    async def read(self, position: dict) -> tuple[list, dict, bool]:
+        position = dict(position)
+        events = []
+
+        rows = await self._scan(self.table, "updated_at", position.get("rows"))
+        for row in rows:
+            # Inserts stamp both columns with the same now()
+            kind = "insert" if row.get("created_at") == row["updated_at"] else "update"
+            events.append(ChangeEvent(kind, row["id"], row, row["updated_at"]))
+        if rows:
+            position["rows"] = [rows[-1]["updated_at"], str(rows[-1]["id"])]
+        more = len(rows) >= self.batch_size
+
+        if self.deletions_table:
+            tombstones = await self._scan(self.deletions_table, "deleted_at", position.get("deletions"))
+            for tombstone in tombstones:
+                row = tombstone.get("old_row") or {"id": tombstone["id"]}
+                events.append(ChangeEvent("delete", tombstone["id"], row, tombstone["deleted_at"]))
+            if tombstones:
+                position["deletions"] = [tombstones[-1]["deleted_at"], str(tombstones[-1]["id"])]
+            more = more or len(tombstones) >= self.batch_size
+
+        # Both streams in one timeline (sort is stable within each)
+        events.sort(key=lambda event: parse_timestamp(event.changed_at))
+        return events, position, more
+
+
+# ============ CHECKPOINTS ============
+class MemoryCheckpoints:
+    """Position kept in process - a restart starts from "now" again"""
+
+    def __init__(self):
+        self.position: Optional[dict] = None
+
+    async def load(self) -> Optional[dict]:
+        return self.position
+
+    async def save(self, position: dict):
+        self.position = position
+
+
+class FileCheckpoints:
+    """Position in a JSON file, replaced atomically (one file per worker)
+
+    Worth it when the state being kept warm outlives the process, e.g.
+    the redis profile cache. File I/O runs in a thread.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def _read(self) -> Optional[dict]:
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except ValueError:
+            logger.warning("Unreadable change feed checkpoint %s, starting from now", self.path)
+            return None
+
+    def _write(self, position: dict):
+        # Unique temp file in the same directory - os.replace stays atomic
+        with tempfile.NamedTemporaryFile(
+            "w", dir=os.path.dirname(self.path) or ".", prefix=os.path.basename(self.path), suffix=".tmp", delete=False
+        ) as f:
+            json.dump(position, f)
+        try:
+            os.replace(f.name, self.path)
+        except OSError:
+            os.unlink(f.name)
+            raise
+
+    async def load(self) -> Optional[dict]:
+        return await asyncio.to_thread(self._read)
+
+    async def save(self, position: dict):
+        await asyncio.to_thread(self._write, position)
+
+
+def checkpoint_path(settings: Any) -> str:
+    """This worker's checkpoint file - workers tail the feed independently"""
+    worker = settings.change_feed_worker_id or str(os.getpid())
+    return f"{settings.change_feed_checkpoint_path}.{worker}"
+
+
+# ============ SUBSCRIBERS ============
+def _is_newer(cached: dict, row: dict) -> bool:
+    """cached row written after row (a later local write already landed)"""
+    if not cached.get("updated_at") or not row.get("updated_at"):
+        return False
+    return parse_timestamp(cached["updated_at"]) > parse_timestamp(row["updated_at"])
+
+
+class StatsSubscriber:
+    """Role / city counters and memoized totals
+
+    Runs before the cache subscriber: an update is diffed against the
+    cached row; without one the counters are marked dirty and reloaded on
+    the next stats read. Deltas are not idempotent, so events the last
+    stats load already counted, and redelivered ones, are skipped.
+    """
+
+    def __init__(self, stats: Any, totals: Any, cache: Any = None):
+        self.stats = stats
+        self.totals = totals
+        self.cache = cache
+        # Per source stream: (changed_at, id) of the last event applied
+        self.applied: dict = {}
+
+    @staticmethod
+    def _position(event: ChangeEvent) -> tuple:
+        # Rows and tombstones are each ordered, not with each other
+        stream = "deletions" if event.kind == "delete" else "rows"
+        return stream, (parse_timestamp(event.changed_at), event.profile_id)
+
+    def _counted(self, event: ChangeEvent) -> bool:
+        """Already in the counters - loaded with them or applied before"""
+        stream, position = self._position(event)
+        if self.stats.loaded_at is not None and position[0] <= self.stats.loaded_at:
+            return True
+        last = self.applied.get(stream)
+        return last is not None and position <= last
+
+    async def apply(self, events: list):
+        changed = False
+        for event in events:
+            if event.local or self._counted(event):
+                continue
+            if event.kind == "insert":
+                self.stats.add(event.row, +1)
+            elif event.kind == "delete":
+                if "role" in event.row:
+                    self.stats.add(event.row, -1)
+                else:
+                    self.stats.mark_dirty()
+            else:
+                old = await self.cache.get_by_id(event.profile_id, allow_stale=True) if self.cache else None
+                if old is not None and _is_newer(old, event.row):
+                    old = None
+                if old is None or old.get("updated_at") != event.row.get("updated_at"):
+                    self.stats.replace(old, event.row)
+            stream, position = self._position(event)
+            self.applied[stream] = position
+            changed = True
+        if changed:
+            self.totals.clear()
+
+
+class AutocompleteSubscriber:
+    """Prefix index entries for changed / deleted profiles"""
+
+    def __init__(self, index: Any):
+        self.index = index
+
+    async def apply(self, events: list):
+        # Last event per id wins, then one merge for the whole batch
+        latest = {}
+        for event in events:
+            if not event.local:
+                latest[event.profile_id] = None if event.kind == "delete" else event.row
+        if latest:
+            self.index.update_many(
+                [row for row in latest.values() if row is not None],
+                [profile_id for profile_id, row in latest.items() if row is None]
+            )
+
+
+class CacheSubscriber:
+    """Refresh cached profiles changed elsewhere, drop deleted ones
+
+    Rows not cached here are not added (only their email key is dropped,
+    it can outlive the id key); a cached row newer than the event is kept.
+    """
+
+    def __init__(self, cache: Any):
+        self.cache = cache
+
+    async def apply(self, events: list):
+        for event in events:
+            if event.local:
+                continue
+            cached = await self.cache.get_by_id(event.profile_id, allow_stale=True)
+            email = event.row.get("email")
+            if event.kind == "delete":
+                await self.cache.invalidate(event.profile_id)
+                if email:
+                    await self.cache.invalidate(event.profile_id, email)
+                continue
+            if cached is None:
+                if email:
+                    await self.cache.invalidate(event.profile_id, email)
+                continue
+            if _is_newer(cached, event.row):
+                continue
+            if cached.get("email") and cached["email"] != email:
+                await self.cache.invalidate(event.profile_id, cached["email"])
+            await self.cache.put(event.row)
+
+
+# ============ FEED ============
+class ChangeFeed:
+    """Reads a ChangeSource and hands each batch to the subscribers, in order
+
+    The checkpoint moves only after every subscriber applied the batch;
+    a failure means the same batch is read again on the next poll.
+    """
+
+    def __init__(
+        self,
+        source: ChangeSource,
+        checkpoints: Any = None,
+        is_local: Optional[Callable[[ChangeEvent], bool]] = None
+    ):
+        self.source = source
+        self.checkpoints = checkpoints or MemoryCheckpoints()
+        self.is_local = is_local
+        self.subscribers: list = []
+        self.position: Optional[dict] = None
+        self.delivered = 0
+        self.batches = 0
+        self.failures = 0
+        self.last_poll: Optional[float] = None
+
+    def subscribe(self, subscriber: Any) -> Any:
+        """Add a subscriber (anything with `async apply(events)`)"""
+        self.subscribers.append(subscriber)
+        return subscriber
+
+    async def start(self):
+        """Resume from the checkpoint, else from the source's "now" """
+        self.position = await self.checkpoints.load()
+        if self.position is None:
+            self.position = await self.source.start_position()
+            await self.checkpoints.save(self.position)
+
+    async def poll(self) -> bool:
+        """Apply one batch -> True if more are waiting"""
+        if self.position is None:
+            await self.start()
+        events, position, more = await self.source.read(self.position)
+
+        if events:
+            for event in events:
+                event.local = self.is_local(event) if self.is_local else False
+            for subscriber in self.subscribers:
+                await subscriber.apply(events)
+            for event in events:
+                change_events.inc(event.kind, "local" if event.local else "remote")
+            lag = datetime.now(timezone.utc) - parse_timestamp(events[-1].changed_at)
+            change_lag.observe(max(0.0, lag.total_seconds()))
+            self.delivered += len(events)
+            self.batches += 1
+
+        if position != self.position:
+            await self.checkpoints.save(position)
+            self.position = position
+        self.last_poll = time.time()
+        return more
+
+    async def run(self, interval: float):
+        """Background loop - drain the backlog, then poll every `interval` seconds"""
+        while True:
+            try:
+                more = await self.poll()
+            except Exception:
+                self.failures += 1
+                logger.exception("Change feed poll failed, retrying")
+                more = False
+            if not more:
+                await asyncio.sleep(interval)
+
+    def stats(self) -> dict:
+        return {
+            "position": self.position,
+            "delivered": self.delivered,
+            "batches": self.batches,
+            "failures": self.failures,
+            "last_poll": self.last_poll
+        }
+
+
+def build_change_feed(service: Any) -> ChangeFeed:
+    """Polling feed wired to the service's cache, stats and autocomplete index"""
+    settings = service.settings
+    source = PollingChangeSource(
+        service.client,
+        service.table,
+        deletions_table=settings.change_feed_deletions_table,
+        batch_size=settings.change_feed_batch_size,
+        settle=settings.change_feed_settle
+    )
+    checkpoints = FileCheckpoints(checkpoint_path(settings)) if settings.change_feed_checkpoint_path else MemoryCheckpoints()
+    feed = ChangeFeed(source, checkpoints, service.is_own_write)
+    # Stats first - they diff against the cached row before it is replaced
+    feed.subscribe(StatsSubscriber(service.stats, service.totals, service.cache))
+    if service.autocomplete is not None:
+        feed.subscribe(AutocompleteSubscriber(service.autocomplete))
+    if service.cache:
+        feed.subscribe(CacheSubscriber(service.cache))
+    return feed
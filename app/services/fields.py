@@ -0,0 +1,45 @@
+from typing import Iterable, Optional
+from app.models import ProfileResponse
+
+PROFILE_FIELDS = tuple(ProfileResponse.model_fields)
+
+# Named projections for ?fields=
+PROJECTIONS = {
+    "summary": ("id", "full_name", "avatar_url", "role")
+}
+
+
+class InvalidFieldsError(ValueError):
+    """Unknown column in ?fields="""
+
+
+def parse_fields(fields: Optional[str]) -> Optional[tuple]:
+    """'summary' or 'id,full_name,...' -> column tuple, None = all columns"""
+    if fields is None or not fields.strip():
+        return None
+    name = fields.strip().lower()
+    if name in PROJECTIONS:
+        return PROJECTIONS[name]
+
+    columns = tuple(dict.fromkeys(part.strip() for part in fields.split(",") if part.strip()))
+    unknown = [column for column in columns if column not in PROFILE_FIELDS]
+    if unknown:
+        raise InvalidFieldsError(
+            f"Unknown fields: {', '.join(unknown)}. "
+            f"Allowed: {', '.join(PROFILE_FIELDS)} or {', '.join(PROJECTIONS)}"
+        )
+    return columns
+
+
+def select_columns(fields: Optional[tuple], required: Iterable[str] = ()) -> str:
+    """PostgREST select= for the fields plus columns the caller needs itself"""
+    if fields is None:
+        return "*"
+    return ",".join(dict.fromkeys((*fields, *required)))
+
+
+def project(row: dict, fields: Optional[tuple]) -> dict:
+    """Keep only the requested keys (drops cursor / ETag helper columns)"""
+    if fields is None:
+        return row
+    return {key: row[key] for key in fields if key in row}
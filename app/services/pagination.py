@@ -0,0 +1,54 @@
+import base64
+import json
+from typing import Optional
+from app.filters import Predicate, col
+
+
+class InvalidCursorError(ValueError):
+    """Cursor could not be decoded"""
+
+
+class PageResult:
+    """One page of rows plus total / has_more info"""
+    def __init__(
+        self,
+        rows: list,
+        total: Optional[int] = None,
+        total_is_exact: bool = True,
+        has_more: Optional[bool] = None
+    ):
+        self.rows = rows
+        self.total = total
+        self.total_is_exact = total_is_exact
+        self.has_more = has_more
+
+
+def encode_cursor(created_at: str, profile_id: str, source: Optional[str] = None) -> str:
+    """Opaque cursor for keyset pagination on (created_at, id)
+
+    source names what issued it (e.g. a search engine) so cursors are not
+    replayed against a different ordering.
+    """
+    values = [created_at, str(profile_id)]
+    if source is not None:
+        values.append(source)
+    raw = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, source: Optional[str] = None) -> tuple[str, str]:
+    """Cursor -> (created_at, id); it must have been issued by `source`"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded))
+        created_at, profile_id, *issued_by = values
+    except (ValueError, TypeError):
+        raise InvalidCursorError("Invalid cursor")
+    if issued_by != ([] if source is None else [source]):
+        raise InvalidCursorError("Cursor belongs to a different listing")
+    return str(created_at), str(profile_id)
+
+
+def keyset_after(created_at: str, profile_id: str) -> Predicate:
+    """Rows strictly after the cursor in (created_at desc, id desc) order"""
+    return col("created_at").lt(created_at) | (col("created_at").eq(created_at) & col("id").lt(profile_id))
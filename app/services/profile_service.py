@@ -1,159 +1,745 @@
-from app.database import db_client
-from app.models import ProfileCreate, ProfileUpdate, RoleEnum
-from typing import Optional
+import asyncio
+import logging
+from datetime import datetime, timezone
+from functools import lru_cache
+from app import metrics
+from app.database import get_async_db_client, DatabaseError, NotFoundError, UpstreamUnavailableError
+from app.config import get_settings
+from app.cache import build_profile_cache, LRUCache
+from app.filters import Param
+from app.services.pagination import PageResult, encode_cursor, decode_cursor, keyset_after
+from app.services.stats import ProfileStats
+from app.services.search import build_search_engines
+from app.services.fields import project, select_columns
+from app.models import PROFILE_CREATE_LIST, CountStrategy, ProfileCreate, ProfileUpdate, RoleEnum
+from typing import TYPE_CHECKING, AsyncIterator, Optional
 from uuid import UUID
 
+if TYPE_CHECKING:
+    from app.services.changefeed import ChangeEvent
+
+logger = logging.getLogger(__name__)
+
+# Columns that move the role / city / country counters
+STATS_FIELDS = ("role", "is_active", "city", "country")
+
+
+def touched(data: dict) -> dict:
+    """Write payload with a new updated_at, as sql/apply_profile_patches.sql sets it
+
+    ETags, If-Match and the change feed all key on updated_at, so every
+    PATCH moves it (the optional touch_updated_at trigger overrides it).
+    """
+    return {**data, "updated_at": datetime.now(timezone.utc).isoformat()}
+
 
 class ProfileService:
-    """Profile CRUD operations"""
+    """Profile CRUD operations (async)"""
     
     def __init__(self):
-        self.client = db_client
+        self.client = get_async_db_client()
         self.table = "profiles"
+        # Hot reads prepared once (URL / static params / headers); values bound per call
+        self.by_id = self.client.from_(self.table).select("*").eq("id", Param("id")).prepare()
+        self.by_email = self.client.from_(self.table).select("*").eq("email", Param("email")).prepare()
+        self.by_role = self.client.from_(self.table)\
+            .eq("role", Param("role"))\
+            .order("created_at", desc=True)\
+            .prepare()
+        self.cache = build_profile_cache()
+        self.settings = get_settings()
+        # Memoized totals per (strategy, is_active, role)
+        self.totals = LRUCache(max_size=256, ttl=self.settings.count_cache_ttl)
+        # Role / city / country counters, adjusted by delta on writes
+        self.stats = ProfileStats()
+        self._stats_lock = asyncio.Lock()
+        self.search_engines = build_search_engines(self)
+        # Optional prefix index, kept current by our own writes
+        self.autocomplete = None
+        if self.settings.autocomplete_enabled:
+            from app.services.autocomplete import AutocompleteIndex  # optional modules load only when enabled
+            self.autocomplete = AutocompleteIndex()
+        # Optional batched updates; reads see unflushed fields via the overlay
+        self.write_behind = None
+        if self.settings.write_behind_enabled:
+            from app.services.write_behind import WriteBehindBuffer
+            self.write_behind = WriteBehindBuffer(
+                self._apply_patches,
+                window=self.settings.write_behind_window,
+                max_pending=self.settings.write_behind_max_pending,
+                batch_size=self.settings.write_behind_batch_size
+            )
+        # Optional change feed: writes made elsewhere reach cache / stats / autocomplete
+        self.change_feed = None
+        if self.settings.change_feed_enabled:
+            # (id, updated_at) of our own writes - the feed skips their echoes
+            self.recent_writes = LRUCache(max_size=10000, ttl=300.0)
+            from app.services.changefeed import build_change_feed
+            self.change_feed = build_change_feed(self)
+    
+    def _note_write(self, profile: Optional[dict], deleted: bool = False):
+        """Remember a row version we wrote (change feed echo detection)"""
+        if self.change_feed is not None and profile:
+            version = "deleted" if deleted else profile.get("updated_at")
+            self.recent_writes.set(f"{profile['id']}@{version}", True)
+    
+    def is_own_write(self, event: "ChangeEvent") -> bool:
+        """Change event caused by this process (already applied locally)"""
+        version = "deleted" if event.kind == "delete" else event.row.get("updated_at")
+        return self.recent_writes.get(f"{event.profile_id}@{version}") is not None
+    
+    def write_token(self, profile_id) -> Optional[str]:
+        """Version of the write-behind fields queued for a profile (part of its ETag)"""
+        if self.write_behind is None:
+            return None
+        return self.write_behind.token(profile_id)
+    
+    def _with_overlay(self, profile: Optional[dict]) -> Optional[dict]:
+        """Apply write-behind fields not yet flushed (read-your-writes)"""
+        if profile is None or self.write_behind is None:
+            return profile
+        patch = self.write_behind.overlay(profile["id"])
+        return {**profile, **patch} if patch else profile
     
-    def create_profile(self, profile_data: ProfileCreate) -> Optional[dict]:
+    def _with_overlay_rows(self, rows: list) -> list:
+        """_with_overlay for list pages - only the selected columns are patched
+        
+        Which rows match the filters (and their order) still follows the
+        database until the flush.
+        """
+        if self.write_behind is None:
+            return rows
+        patched = []
+        for row in rows:
+            patch = self.write_behind.overlay(row["id"])
+            if patch:
+                row = {**row, **{key: value for key, value in patch.items() if key in row}}
+            patched.append(row)
+        return patched
+    
+    async def _stale_profile(self, profile_id: Optional[UUID] = None, email: Optional[str] = None) -> Optional[dict]:
+        """Expired cached row while Supabase is unavailable (settings.stale_on_error)"""
+        if not self.cache or not self.settings.stale_on_error:
+            return None
+        if email is not None:
+            stale = await self.cache.get_by_email(email, allow_stale=True)
+        else:
+            stale = await self.cache.get_by_id(profile_id, allow_stale=True)
+        if stale is not None:
+            metrics.stale_reads.inc("profile")
+        return stale
+    
+    async def create_profile(self, profile_data: ProfileCreate) -> Optional[dict]:
         """Create new profile"""
-        data = profile_data.model_dump(exclude_none=True)
+        data = profile_data.to_row()
+        
+        response = await self.client.from_(self.table).insert(data).execute()
+        profile = response.data[0] if response.data else None
+        
+        self.totals.clear()
+        self._note_write(profile)
+        if profile:
+            self.stats.add(profile, +1)
+            if self.autocomplete is not None:
+                self.autocomplete.add(profile)
+        if profile and self.cache:
+            await self.cache.put(profile)
+        return profile
+    
+    async def get_profile_by_id(self, profile_id: UUID, fields: Optional[tuple] = None) -> Optional[dict]:
+        """Get profile by ID (cache first)
         
-        # Convert date to string
-        if 'date_of_birth' in data and data['date_of_birth']:
-            data['date_of_birth'] = str(data['date_of_birth'])
+        fields: columns to fetch on a cache miss (id / updated_at always
+        included for the ETag). Partial rows are not cached; a cached row
+        is returned whole - callers project it. If Supabase is down an
+        expired cached row is served instead of the 503.
+        """
+        if self.cache:
+            cached = await self.cache.get_by_id(profile_id)
+            if cached is not None:
+                return self._with_overlay(cached)
         
-        # Convert enum to string
-        if 'role' in data:
-            data['role'] = data['role'].value if hasattr(data['role'], 'value') else data['role']
+        started = self.cache.read_started() if self.cache else 0
+        try:
+            query = self.by_id.bind(id=str(profile_id))
+            if fields is not None:
+                query = query.select(select_columns(fields, ("id", "updated_at")))
+            response = await query.execute()
+        except UpstreamUnavailableError:
+            stale = await self._stale_profile(profile_id=profile_id)
+            if stale is None:
+                raise
+            return self._with_overlay(stale)
         
-        response = self.client.from_(self.table).insert(data).execute()
-        return response.data[0] if response.data else None
+        profile = response.data[0] if response.data else None
+        if profile and self.cache and fields is None:
+            await self.cache.fill(profile, started)
+        return self._with_overlay(profile)
     
-    def get_profile_by_id(self, profile_id: UUID) -> Optional[dict]:
-        """Get profile by ID"""
-        response = self.client.from_(self.table)\
-            .select("*")\
-            .eq("id", str(profile_id))\
-            .execute()
+    async def get_profile_by_email(self, email: str) -> Optional[dict]:
+        """Get profile by email (cache first)"""
+        if self.cache:
+            cached = await self.cache.get_by_email(email)
+            if cached is not None:
+                return self._with_overlay(cached)
+        
+        started = self.cache.read_started() if self.cache else 0
+        try:
+            response = await self.by_email.bind(email=email).execute()
+        except UpstreamUnavailableError:
+            stale = await self._stale_profile(email=email)
+            if stale is None:
+                raise
+            return self._with_overlay(stale)
         
-        return response.data[0] if response.data else None
+        profile = response.data[0] if response.data else None
+        if profile and self.cache:
+            await self.cache.fill(profile, started)
+        return self._with_overlay(profile)
     
-    def get_profile_by_email(self, email: str) -> Optional[dict]:
-        """Get profile by email"""
-        response = self.client.from_(self.table)\
-            .select("*")\
-            .eq("email", email)\
-            .execute()
+    async def get_profiles_by_ids(self, profile_ids: list) -> tuple[list, list]:
+        """Fetch many profiles in few round trips -> (profiles in request order, missing ids)"""
+        ids = list(dict.fromkeys(str(profile_id) for profile_id in profile_ids))
+        found = {}
+        
+        if self.cache:
+            for profile_id in ids:
+                cached = await self.cache.get_by_id(profile_id)
+                if cached is not None:
+                    found[profile_id] = cached
         
-        return response.data[0] if response.data else None
+        # Remaining ids in URL-length-safe chunks, fetched concurrently
+        pending = [profile_id for profile_id in ids if profile_id not in found]
+        size = self.settings.batch_get_chunk_size
+        started = self.cache.read_started() if self.cache else 0
+        chunks = [pending[i:i + size] for i in range(0, len(pending), size)]
+        
+        async def fetch(chunk: list) -> list:
+            response = await self.client.from_(self.table)\
+                .select("*")\
+                .in_("id", chunk)\
+                .execute()
+            return response.data
+        
+        for rows in await asyncio.gather(*[fetch(chunk) for chunk in chunks]):
+            for row in rows:
+                found[str(row["id"])] = row
+                if self.cache:
+                    await self.cache.fill(row, started)
+        
+        profiles = [self._with_overlay(found[profile_id]) for profile_id in ids if profile_id in found]
+        missing = [profile_id for profile_id in ids if profile_id not in found]
+        return profiles, missing
     
-    def get_all_profiles(
+    async def get_all_profiles(
         self, 
         page: int = 1, 
         limit: int = 10,
         is_active: Optional[bool] = None,
-        role: Optional[str] = None  # NEW PARAMETER
-    ) -> tuple[list, int]:
-        """Get all profiles with pagination and filters"""
+        role: Optional[str] = None,  # NEW PARAMETER
+        count_strategy: Optional[CountStrategy] = None,
+        fields: Optional[tuple] = None
+    ) -> PageResult:
+        """Get all profiles with pagination and filters
+        
+        count_strategy: exact | planned | estimated | none (none = only has_more)
+        fields: columns to select (None = all)
+        """
         offset = (page - 1) * limit
+        strategy = CountStrategy(count_strategy or self.settings.count_strategy_profiles)
+        totals_key = (strategy.value, is_active, role)
+        cached_total = self.totals.get(totals_key)
         
-        query = self.client.from_(self.table).select("*", count="exact")
+        # Count only when needed - cached totals skip the count entirely
+        count = strategy.value if strategy != CountStrategy.NONE and cached_total is None else None
+        
+        # Filter by role - NEW
+        if role is not None:
+            query = self.by_role.bind(role=role)
+        else:
+            query = self.client.from_(self.table).order("created_at", desc=True)
+        # id to look up write-behind fields; dropped again below
+        required = ("id",) if self.write_behind is not None else ()
+        query = query.select(select_columns(fields, required), count=count)
         
         # Filter by active status
         if is_active is not None:
             query = query.eq("is_active", is_active)
         
-        # Filter by role - NEW
+        # One extra row -> has_more without a count
+        response = await query\
+            .range(offset, offset + limit)\
+            .execute()
+        
+        rows = response.data[:limit]
+        has_more = len(response.data) > limit
+        if self.write_behind is not None:
+            rows = [project(row, fields) for row in self._with_overlay_rows(rows)]
+        
+        if strategy == CountStrategy.NONE:
+            return PageResult(rows, None, total_is_exact=False, has_more=has_more)
+        
+        total = cached_total
+        if total is None:
+            total = response.count if response.count is not None else offset + len(response.data)
+            self.totals.set(totals_key, total)
+        
+        return PageResult(rows, total, total_is_exact=strategy == CountStrategy.EXACT, has_more=has_more)
+    
+    async def get_profiles_after(
+        self,
+        cursor: Optional[str] = None,
+        limit: int = 10,
+        is_active: Optional[bool] = None,
+        role: Optional[str] = None,
+        columns: str = "*"
+    ) -> tuple[list, Optional[str]]:
+        """Keyset pagination on (created_at, id) - cost stays flat for deep pages
+        
+        columns must include created_at and id when not "*".
+        """
+        response = await self._keyset_query(cursor, limit, is_active, role, columns).execute()
+        
+        rows = response.data[:limit]
+        next_cursor = None
+        if len(response.data) > limit:
+            last = rows[-1]
+            next_cursor = encode_cursor(last["created_at"], last["id"])
+        return self._with_overlay_rows(rows), next_cursor
+    
+    def _keyset_query(
+        self,
+        cursor: Optional[str],
+        limit: int,
+        is_active: Optional[bool],
+        role: Optional[str],
+        columns: str
+    ):
+        """Page after cursor, newest first - asks for one extra row (has more?)"""
+        query = self.client.from_(self.table).select(columns)
+        
+        if is_active is not None:
+            query = query.eq("is_active", is_active)
         if role is not None:
             query = query.eq("role", role)
         
-        response = query\
+        if cursor:
+            created_at, last_id = decode_cursor(cursor)
+            query = query.where(keyset_after(created_at, last_id))
+        
+        return query\
             .order("created_at", desc=True)\
-            .range(offset, offset + limit - 1)\
-            .execute()
+            .order("id", desc=True)\
+            .limit(limit + 1)
+    
+    async def iter_profiles(
+        self,
+        is_active: Optional[bool] = None,
+        role: Optional[str] = None,
+        page_size: int = 1000,
+        columns: str = "*"
+    ) -> AsyncIterator[dict]:
+        """Walk the whole table in keyset order
+        
+        Rows are decoded as they stream in, so memory stays at about one row
+        whatever the page size.
+        """
+        cursor = None
+        while True:
+            seen = 0
+            last = None
+            # page_size + 1 rows come back; the extra one only means "more"
+            async for row in self._keyset_query(cursor, page_size, is_active, role, columns).execute_iter():
+                seen += 1
+                if seen <= page_size:
+                    last = row
+                    yield row
+            if seen <= page_size:
+                return
+            cursor = encode_cursor(last["created_at"], last["id"])
+    
+    async def bulk_create_profiles(self, batch: list, upsert: bool = False) -> tuple[list, list]:
+        """Insert (or upsert on email) one batch of (index, ProfileCreate)
+        
+        Returns (saved rows, per-row errors).
+        """
+        if upsert:
+            rows, errors = await self._upsert_profiles(batch)
+        else:
+            rows, errors = await self._insert_profiles(
+                batch, PROFILE_CREATE_LIST.dump_python([profile for _, profile in batch], mode="json", exclude_none=True)
+            )
+            if not errors:
+                saved_emails = {row["email"] for row in rows}
+                errors = [
+                    {"index": index, "email": profile.email, "error": "Email already exists!"}
+                    for index, profile in batch if profile.email not in saved_emails
+                ]
+        
+        self.totals.clear()
+        for row in rows:
+            self._note_write(row)
+        if self.autocomplete is not None:
+            # One merge for the batch - per-row adds are O(index) each
+            self.autocomplete.update_many(rows)
+        if upsert:
+            # Old rows unknown - let the next stats read reconcile
+            self.stats.mark_dirty()
+            if self.cache:
+                for row in rows:
+                    await self.cache.invalidate(row["id"], row.get("email"))
+        else:
+            for row in rows:
+                self.stats.add(row, +1)
+        return rows, errors
+    
+    async def _insert_profiles(self, batch: list, payload: list, upsert: bool = False) -> tuple[list, list]:
+        """One insert request; a failure is reported against every row"""
+        try:
+            # Plain import skips existing emails instead of failing the batch
+            response = await self.client.from_(self.table)\
+                .insert(payload, upsert=upsert, on_conflict="email", ignore_duplicates=not upsert)\
+                .execute()
+        except DatabaseError as e:
+            return [], [{"index": index, "email": profile.email, "error": e.message} for index, profile in batch]
+        return response.data, []
+    
+    async def _upsert_profiles(self, batch: list) -> tuple[list, list]:
+        """Upsert on email, writing only the columns each upload row supplied
         
-        total = response.count if response.count else len(response.data)
-        return response.data, total
+        Model defaults (role="user") must not overwrite stored values, so
+        rows for existing emails carry just their set fields; new emails get
+        the full row. PostgREST needs one key set per request - rows are
+        grouped by theirs.
+        """
+        existing = await self._existing_emails([profile.email for _, profile in batch])
+        groups: dict = {}
+        for index, profile in batch:
+            if profile.email in existing:
+                row = touched(profile.model_dump(mode="json", exclude_unset=True))
+            else:
+                row = profile.to_row()
+            groups.setdefault(tuple(sorted(row)), []).append((index, profile, row))
+        
+        results = await asyncio.gather(*[
+            self._insert_profiles([(index, profile) for index, profile, _ in group], [row for _, _, row in group], upsert=True)
+            for group in groups.values()
+        ])
+        rows = [row for saved, _ in results for row in saved]
+        errors = [error for _, failed in results for error in failed]
+        return rows, errors
+    
+    async def _existing_emails(self, emails: list) -> set:
+        """Which of these emails already have a profile (URL-length-safe chunks)"""
+        size = self.settings.batch_get_chunk_size
+        
+        async def fetch(chunk: list) -> list:
+            response = await self.client.from_(self.table)\
+                .select("email")\
+                .in_("email", chunk)\
+                .execute()
+            return response.data
+        
+        chunks = [emails[i:i + size] for i in range(0, len(emails), size)]
+        return {row["email"] for rows in await asyncio.gather(*[fetch(chunk) for chunk in chunks]) for row in rows}
     
-    def update_profile(self, profile_id: UUID, update_data: ProfileUpdate) -> Optional[dict]:
-        """Update profile"""
-        data = update_data.model_dump(exclude_none=True)
+    async def update_profile(
+        self,
+        profile_id: UUID,
+        update_data: ProfileUpdate,
+        expected_updated_at: Optional[str] = None,
+        expected_write: Optional[str] = None
+    ) -> Optional[dict]:
+        """Update profile
+        
+        expected_updated_at: only update if the row still has this updated_at
+        (If-Match); None is returned when it does not.
+        expected_write: write_token() the caller saw on top of that row
+        (ETag of a row with queued write-behind fields).
+        """
+        data = update_data.to_row()
         
         if not data:
-            return self.get_profile_by_id(profile_id)
+            profile = await self.get_profile_by_id(profile_id)
+            if profile and expected_updated_at and (
+                profile.get("updated_at") != expected_updated_at or self.write_token(profile_id) != expected_write
+            ):
+                return None
+            return profile
         
-        # Convert date
-        if 'date_of_birth' in data and data['date_of_birth']:
-            data['date_of_birth'] = str(data['date_of_birth'])
+        if self.write_behind is not None:
+            if expected_updated_at is None:
+                return await self._update_write_behind(profile_id, data)
+            # Conditional write - earlier queued patches must land first
+            if self.write_behind.overlay(profile_id):
+                await self.write_behind.flush()
+            if expected_write is not None:
+                # The caller saw queued fields - check against where they landed
+                expected_updated_at = self.write_behind.landed(profile_id, expected_write)
+                if expected_updated_at is None:
+                    return None
+        elif expected_write is not None:
+            return None
         
-        # Convert enum to string - NEW
-        if 'role' in data:
-            data['role'] = data['role'].value if hasattr(data['role'], 'value') else data['role']
+        # Old row (cache only, no network) lets stats move by delta
+        old_profile = await self._cached_old_row(profile_id, data)
         
-        response = self.client.from_(self.table)\
-            .update(data)\
-            .eq("id", str(profile_id))\
-            .execute()
+        query = self.client.from_(self.table)\
+            .update(touched(data))\
+            .eq("id", str(profile_id))
+        if expected_updated_at:
+            query = query.eq("updated_at", expected_updated_at)
+        response = await query.execute()
+        
+        profile = response.data[0] if response.data else None
+        await self._after_update(profile_id, data, old_profile, profile)
+        return profile
+    
+    async def _cached_old_row(self, profile_id: UUID, data: dict) -> Optional[dict]:
+        """Pre-update row from cache when the update moves stats (no network)"""
+        if self.cache and any(key in data for key in STATS_FIELDS):
+            return await self.cache.get_by_id(profile_id)
+        return None
+    
+    async def _after_update(
+        self,
+        profile_id: UUID,
+        data: dict,
+        old_profile: Optional[dict],
+        profile: Optional[dict],
+        reindex: bool = True
+    ):
+        """Keep stats / totals / autocomplete / cache in step with one update
         
-        return response.data[0] if response.data else None
+        reindex=False leaves the autocomplete index to the caller (batches).
+        """
+        self._note_write(profile)
+        if profile and any(key in data for key in STATS_FIELDS):
+            self.stats.replace(old_profile, profile)
+        if profile and reindex and self.autocomplete is not None:
+            self.autocomplete.add(profile)
+        if "role" in data or "is_active" in data:
+            self.totals.clear()
+        if self.cache:
+            if profile:
+                await self.cache.put(profile)
+            else:
+                await self.cache.invalidate(profile_id)
     
-    def delete_profile(self, profile_id: UUID) -> bool:
+    async def _update_write_behind(self, profile_id: UUID, data: dict) -> Optional[dict]:
+        """Queue the patch; the caller gets the row as it will look after flush"""
+        profile = await self.get_profile_by_id(profile_id)
+        if not profile:
+            return None
+        await self.write_behind.submit(profile_id, data)
+        return {**profile, **data}
+    
+    async def _apply_patches(self, patches: dict) -> list:
+        """Flush write-behind patches {id: fields} - one RPC, else one PATCH each"""
+        try:
+            response = await self.client.rpc(
+                "apply_profile_patches",
+                {"patches": [{"id": profile_id, "patch": patch} for profile_id, patch in patches.items()]}
+            ).execute()
+            rows = response.data
+        except NotFoundError:
+            # sql/apply_profile_patches.sql not installed yet
+            async def patch_one(profile_id: str, patch: dict) -> list:
+                response = await self.client.from_(self.table)\
+                    .update(touched(patch))\
+                    .eq("id", profile_id)\
+                    .execute()
+                return response.data
+            
+            results = await asyncio.gather(
+                *[patch_one(profile_id, patch) for profile_id, patch in patches.items()],
+                return_exceptions=True
+            )
+            rows, errors = [], {}
+            for profile_id, result in zip(patches, results):
+                if isinstance(result, BaseException):
+                    errors[profile_id] = result
+                else:
+                    rows.extend(result)
+            await self._after_patches(patches, rows)
+            if errors:
+                # Landed rows are applied above; the buffer handles the rest
+                from app.services.write_behind import PartialFlushError  # loaded with the buffer
+                raise PartialFlushError(rows, errors)
+            return rows
+        
+        await self._after_patches(patches, rows)
+        return rows
+    
+    async def _after_patches(self, patches: dict, rows: list):
+        for row in rows:
+            profile_id = str(row["id"])
+            old_profile = await self._cached_old_row(profile_id, patches[profile_id])
+            await self._after_update(profile_id, patches[profile_id], old_profile, row, reindex=False)
+        if self.autocomplete is not None:
+            self.autocomplete.update_many(rows)
+    
+    async def flush_writes(self):
+        """Flush queued write-behind patches (shutdown / tests)"""
+        if self.write_behind is not None:
+            await self.write_behind.close()
+    
+    async def delete_profile(self, profile_id: UUID) -> bool:
         """Delete profile"""
-        response = self.client.from_(self.table)\
+        if self.write_behind is not None:
+            self.write_behind.discard(profile_id)
+        response = await self.client.from_(self.table)\
             .delete()\
             .eq("id", str(profile_id))\
             .execute()
         
+        if response.data:
+            self.totals.clear()
+            self._note_write(response.data[0], deleted=True)
+            self.stats.add(response.data[0], -1)
+            if self.autocomplete is not None:
+                self.autocomplete.remove(profile_id)
+        if self.cache:
+            email = response.data[0].get("email") if response.data else None
+            await self.cache.invalidate(profile_id, email)
         return len(response.data) > 0
     
-    def search_profiles(
+    async def search_profiles(
         self, 
         search_term: str, 
         limit: int = 10,
-        role: Optional[str] = None  # NEW PARAMETER
-    ) -> list:
-        """Search profiles by name or email"""
-        query = self.client.from_(self.table)\
-            .select("*")\
-            .or_(f"full_name.ilike.%{search_term}%,email.ilike.%{search_term}%")
+        role: Optional[str] = None,  # NEW PARAMETER
+        cursor: Optional[str] = None,
+        mode: Optional[str] = None,
+        fields: Optional[tuple] = None
+    ) -> tuple[list, Optional[str]]:
+        """Search profiles by name or email -> (rows, next_cursor)
         
-        # Filter by role - NEW
-        if role is not None:
-            query = query.eq("role", role)
+        mode: ilike | fts (default from settings.search_mode)
+        """
+        engine = self.search_engines[mode or self.settings.search_mode]
+        return await engine.search(search_term, limit, role, cursor, fields)
+    
+    async def build_autocomplete_index(self):
+        """Stream the table into the prefix index (startup)"""
+        if self.autocomplete is None:
+            return
+        self.autocomplete.begin_build()
+        try:
+            async for row in self.iter_profiles(
+                page_size=self.settings.export_page_size,
+                columns="id,full_name,email,role,created_at"
+            ):
+                self.autocomplete.build_add(row)
+        except BaseException:
+            self.autocomplete.abort_build()
+            raise
+        self.autocomplete.finish_build()
+        logger.info("Autocomplete index ready: %s", self.autocomplete.stats())
+    
+    async def run_autocomplete_builder(self, retry_delay: float = 1.0, max_delay: float = 60.0):
+        """Background task - build the index, retrying with backoff until it succeeds"""
+        if self.autocomplete is None:
+            return
+        delay = retry_delay
+        while True:
+            try:
+                await self.build_autocomplete_index()
+                return
+            except Exception:
+                logger.exception("Autocomplete index build failed, retrying in %.1fs", delay)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, max_delay)
+    
+    async def autocomplete_profiles(self, prefix: str, limit: int = 10, role: Optional[str] = None) -> list:
+        """Prefix suggestions - in memory when the index is ready"""
+        if self.autocomplete is not None and self.autocomplete.ready:
+            return self.autocomplete.search(prefix, limit, role)
         
-        response = query.limit(limit).execute()
-        return response.data
+        # Index off or still building - fall back to search
+        rows, _ = await self.search_profiles(prefix, limit, role, fields=("id", "full_name", "email", "role"))
+        return rows
     
     # ============ NEW METHODS ============
     
-    def get_users(self, page: int = 1, limit: int = 10) -> tuple[list, int]:
+    async def get_users(self, page: int = 1, limit: int = 10, fields: Optional[tuple] = None) -> PageResult:
         """Get only users (role = 'user')"""
-        return self.get_all_profiles(page, limit, role="user")
+        return await self.get_all_profiles(
+            page, limit, role="user", count_strategy=self.settings.count_strategy_users, fields=fields
+        )
     
-    def get_institutions(self, page: int = 1, limit: int = 10) -> tuple[list, int]:
+    async def get_institutions(self, page: int = 1, limit: int = 10, fields: Optional[tuple] = None) -> PageResult:
         """Get only institutions (role = 'institution')"""
-        return self.get_all_profiles(page, limit, role="institution")
-    
-    def get_role_stats(self) -> dict:
-        """Get count of users and institutions"""
-        # Get users count
-        users_response = self.client.from_(self.table)\
-            .select("id", count="exact")\
-            .eq("role", "user")\
-            .execute()
+        return await self.get_all_profiles(
+            page, limit, role="institution", count_strategy=self.settings.count_strategy_institutions, fields=fields
+        )
+    
+    async def get_role_stats(self) -> dict:
+        """Role / active / city / country counts (served from memory)"""
+        if self.stats.dirty:
+            await self.refresh_role_stats()
+        return self.stats.summary()
+    
+    async def refresh_role_stats(self, force: bool = False):
+        """Reload stats from the database in one grouped query
         
-        # Get institutions count
-        institutions_response = self.client.from_(self.table)\
-            .select("id", count="exact")\
-            .eq("role", "institution")\
-            .execute()
+        Without force, a caller that waited on another refresh uses its
+        result instead of querying again.
+        """
+        loads = self.stats.loads
+        async with self._stats_lock:
+            if not force and (not self.stats.dirty or self.stats.loads != loads):
+                return
+            started = datetime.now(timezone.utc)
+            changes = self.stats.changes
+            try:
+                response = await self.client.rpc("profile_stats").execute()
+                rows = response.data
+            except NotFoundError:
+                # profile_stats() not installed yet (see sql/profile_stats.sql)
+                rows = await self._count_role_groups()
+            self.stats.load(rows, as_of=started, changes=changes)
+    
+    async def _count_role_groups(self) -> list:
+        """Fallback: per (role, is_active) counts, run concurrently"""
+        groups = [(role.value, is_active) for role in RoleEnum for is_active in (True, False)]
         
-        users_count = users_response.count if users_response.count else 0
-        institutions_count = institutions_response.count if institutions_response.count else 0
+        async def count(role: str, is_active: bool) -> dict:
+            response = await self.client.from_(self.table)\
+                .select("id", count=self.settings.count_strategy_stats.value)\
+                .eq("role", role)\
+                .eq("is_active", is_active)\
+                .limit(1)\
+                .execute()
+            return {"role": role, "is_active": is_active, "total": response.count or 0}
         
-        return {
-            "total_users": users_count,
-            "total_institutions": institutions_count,
-            "total_profiles": users_count + institutions_count
-        }
+        return list(await asyncio.gather(*[count(role, is_active) for role, is_active in groups]))
+    
+    async def run_stats_reconciler(self, interval: float):
+        """Background loop - periodically reconcile stats with the database"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.refresh_role_stats(force=True)
+            except Exception:
+                logger.exception("Stats reconcile failed")
+    
+    def get_cache_stats(self) -> dict:
+        """Profile cache hit ratio / eviction counters"""
+        if not self.cache:
+            return {"enabled": False}
+        return {"enabled": True, **self.cache.stats()}
+
+
+# ============ SHARED INSTANCE ============
+@lru_cache()
+def get_profile_service() -> ProfileService:
+    """Per-process service, built on first use (app lifespan) - not at import"""
+    return ProfileService()
 
 
-# Singleton instance
-profile_service = ProfileService()
\ No newline at end of file
+def __getattr__(name: str):
+    # Old module attribute: `from app.services.profile_service import profile_service`
+    if name == "profile_service":
+        return get_profile_service()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
\ No newline at end of file
@@ -0,0 +1,127 @@
+from typing import Any, Optional
+from app.database import NotFoundError
+from app.filters import col
+from app.services.pagination import InvalidCursorError, encode_cursor, decode_cursor, keyset_after
+from app.services.fields import project, select_columns
+
+
+def like_pattern(term: str) -> str:
+    """%term% with LIKE wildcards in the user's term escaped
+
+    PostgREST treats '*' as '%', so it is dropped from the term.
+    """
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_").replace("*", "")
+    return f"%{escaped}%"
+
+
+class SearchEngine:
+    """Search backend behind /profiles/search/"""
+
+    name = ""
+
+    def __init__(self, service: Any):
+        self.service = service
+
+    async def search(
+        self,
+        term: str,
+        limit: int = 10,
+        role: Optional[str] = None,
+        cursor: Optional[str] = None,
+        fields: Optional[tuple] = None
+    ) -> tuple[list, Optional[str]]:
+        """-> (rows, next_cursor); fields = columns to return (None = all)"""
+        raise NotImplementedError
+
+
+class IlikeSearchEngine(SearchEngine):
+    """ILIKE on full_name / email, newest first
+
+    Uses the pg_trgm GIN indexes from sql/search_profiles.sql when present.
+    """
+
+    name = "ilike"
+
+    async def search(self, term, limit=10, role=None, cursor=None, fields=None):
+        pattern = like_pattern(term)
+        # created_at / id are needed for the next cursor
+        query = self.service.client.from_(self.service.table)\
+            .select(select_columns(fields, ("created_at", "id")))\
+            .where(col("full_name").ilike(pattern) | col("email").ilike(pattern))
+
+        if cursor:
+            created_at, last_id = decode_cursor(cursor, self.name)
+            query = query.where(keyset_after(created_at, last_id))
+
+        if role is not None:
+            query = query.eq("role", role)
+
+        response = await query\
+            .order("created_at", desc=True)\
+            .order("id", desc=True)\
+            .limit(limit + 1)\
+            .execute()
+
+        rows = response.data[:limit]
+        next_cursor = None
+        if len(response.data) > limit:
+            next_cursor = encode_cursor(rows[-1]["created_at"], rows[-1]["id"], self.name)
+        return [project(row, fields) for row in rows], next_cursor
+
+
+class FullTextSearchEngine(SearchEngine):
+    """Ranked full-text search via the search_profiles() RPC
+
+    Pages continue on (rank, id); falls back to ILIKE until the SQL in
+    sql/search_profiles.sql is installed (those pages carry the fallback's
+    cursors, which are only accepted while the RPC is not known to exist).
+    """
+
+    name = "fts"
+
+    def __init__(self, service: Any, fallback: SearchEngine):
+        super().__init__(service)
+        self.fallback = fallback
+        # search_profiles() RPC present - None until the first call
+        self.installed: Optional[bool] = None
+
+    async def search(self, term, limit=10, role=None, cursor=None, fields=None):
+        params = {"q": term, "role_filter": role, "max_rows": limit + 1}
+        if cursor:
+            try:
+                after_rank, after_id = decode_cursor(cursor, self.name)
+            except InvalidCursorError:
+                if self.installed:
+                    raise
+                return await self.fallback.search(term, limit, role, cursor, fields)
+            try:
+                params["after_rank"] = float(after_rank)
+            except ValueError:
+                raise InvalidCursorError("Invalid cursor")
+            params["after_id"] = after_id
+
+        try:
+            response = await self.service.client.rpc("search_profiles", params).execute()
+        except NotFoundError:
+            self.installed = False
+            if cursor:
+                raise InvalidCursorError("Full-text search is unavailable, restart without a cursor")
+            return await self.fallback.search(term, limit, role, cursor, fields)
+        self.installed = True
+
+        # The RPC returns whole rows - projected here for the response size only
+        hits = response.data[:limit]
+        rows = [project(hit["profile"], fields) for hit in hits]
+        next_cursor = None
+        if len(response.data) > limit:
+            last = hits[-1]
+            next_cursor = encode_cursor(str(last["rank"]), last["profile"]["id"], self.name)
+        return rows, next_cursor
+
+
+def build_search_engines(service: Any) -> dict:
+    ilike = IlikeSearchEngine(service)
+    return {
+        ilike.name: ilike,
+        FullTextSearchEngine.name: FullTextSearchEngine(service, fallback=ilike)
+    }
@@ -0,0 +1,94 @@
+from collections import Counter
+from datetime import datetime
+from typing import Optional
+
+
+class ProfileStats:
+    """In-process profile counters grouped by (role, is_active, city, country)
+
+    Loaded from the profile_stats RPC and adjusted by delta on every local
+    write, so serving stats costs no database work in steady state.
+    """
+
+    def __init__(self):
+        self.groups: Counter = Counter()
+        self.dirty = True
+        # When the query behind the last load() started (rows changed
+        # before it are already counted)
+        self.loaded_at: Optional[datetime] = None
+        self.loads = 0
+        # Deltas / dirty marks so far - a load checks for ones it raced
+        self.changes = 0
+
+    @staticmethod
+    def _key(profile: dict) -> tuple:
+        return (
+            profile.get("role") or "user",
+            bool(profile.get("is_active", True)),
+            profile.get("city"),
+            profile.get("country")
+        )
+
+    def load(self, rows: list, as_of: Optional[datetime] = None, changes: Optional[int] = None):
+        """Replace counters with fresh grouped rows from the database
+
+        changes: self.changes when the query started. Deltas applied since
+        may or may not be in rows, so the counters then stay dirty.
+        """
+        groups = Counter()
+        for row in rows:
+            groups[self._key(row)] += int(row.get("total") or 0)
+        self.groups = groups
+        self.dirty = changes is not None and changes != self.changes
+        self.loaded_at = as_of
+        self.loads += 1
+
+    def mark_dirty(self):
+        """Counters can no longer be trusted - reload on the next read"""
+        self.dirty = True
+        self.changes += 1
+
+    def add(self, profile: dict, delta: int = 1):
+        """Apply a create (+1) / delete (-1) for one profile row"""
+        self.changes += 1
+        if self.dirty:
+            return
+        key = self._key(profile)
+        self.groups[key] += delta
+        if self.groups[key] <= 0:
+            del self.groups[key]
+
+    def replace(self, old: Optional[dict], new: dict):
+        """Apply an update; without the old row we can only mark dirty"""
+        if old is None:
+            self.mark_dirty()
+            return
+        self.add(old, -1)
+        self.add(new, +1)
+
+    def summary(self) -> dict:
+        by_role: Counter = Counter()
+        by_city: Counter = Counter()
+        by_country: Counter = Counter()
+        active = inactive = 0
+
+        for (role, is_active, city, country), total in self.groups.items():
+            by_role[role] += total
+            if is_active:
+                active += total
+            else:
+                inactive += total
+            if city:
+                by_city[city] += total
+            if country:
+                by_country[country] += total
+
+        return {
+            "total_users": by_role["user"],
+            "total_institutions": by_role["institution"],
+            "total_profiles": sum(by_role.values()),
+            "total_active": active,
+            "total_inactive": inactive,
+            "by_city": dict(by_city.most_common()),
+            "by_country": dict(by_country.most_common())
+        }
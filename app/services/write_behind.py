@@ -0,0 +1,216 @@
+import asyncio
+import logging
+import uuid
+from typing import Awaitable, Callable, Optional
+from app.cache import LRUCache
+from app.database import DatabaseError, UpstreamUnavailableError
+
+logger = logging.getLogger(__name__)
+
+
+class PartialFlushError(Exception):
+    """Some patches of a batch landed, others failed
+
+    rows: the rows that were updated; errors: {id: exception} for the rest
+    """
+
+    def __init__(self, rows: list, errors: dict):
+        super().__init__(f"{len(errors)} of {len(rows) + len(errors)} patches failed")
+        self.rows = rows
+        self.errors = errors
+
+
+class WriteBehindBuffer:
+    """Coalesce per-profile patches and flush them in batches
+
+    Patches for the same id within `window` seconds are merged field-wise
+    (last write wins). flush_fn receives {id: patch} and returns the
+    updated rows. At most `max_pending` ids wait at once; a write for a new
+    id beyond that flushes first and fails with 503 if upstream still does
+    not take the backlog. Pending and in-flight patches are readable via
+    overlay() for read-your-writes, and token() names that overlay version
+    (ETags); landed() maps a token to the updated_at its flush produced.
+
+    A batch the database rejects is split until the bad patches are alone;
+    only those are dropped (and logged), the rest still land.
+    """
+
+    def __init__(
+        self,
+        flush_fn: Callable[[dict], Awaitable[list]],
+        window: float = 0.5,
+        max_pending: int = 1000,
+        batch_size: int = 200
+    ):
+        self.flush_fn = flush_fn
+        self.window = window
+        self.max_pending = max_pending
+        self.batch_size = batch_size
+        self._pending: dict = {}
+        self._in_flight: dict = {}
+        # Latest overlay version per id, and where flushed versions landed
+        self._instance = uuid.uuid4().hex[:8]
+        self._tokens: dict = {}
+        self._in_flight_tokens: dict = {}
+        self._landed = LRUCache(max_size=10000, ttl=300.0)
+        self._lock = asyncio.Lock()
+        self._timer: Optional[asyncio.Task] = None
+        self.submitted = 0
+        self.flushed_rows = 0
+        self.batches = 0
+        self.failures = 0
+        self.dropped = 0
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    async def submit(self, profile_id: str, patch: dict):
+        """Queue a patch (merged into any pending one for the same id)"""
+        profile_id = str(profile_id)
+        if profile_id not in self._pending and len(self._pending) >= self.max_pending:
+            # Backpressure - drain before taking more
+            await self.flush()
+            if len(self._pending) >= self.max_pending:
+                raise UpstreamUnavailableError(503, "Write queue full, retry later")
+
+        self._pending.setdefault(profile_id, {}).update(patch)
+        self.submitted += 1
+        self._tokens[profile_id] = f"{self._instance}.{self.submitted}"
+        if self._timer is None or self._timer.done():
+            self._timer = asyncio.create_task(self._flush_later())
+
+    def overlay(self, profile_id: str) -> Optional[dict]:
+        """Fields written but not yet flushed (in-flight, then pending on top)"""
+        profile_id = str(profile_id)
+        in_flight = self._in_flight.get(profile_id)
+        pending = self._pending.get(profile_id)
+        if in_flight is None and pending is None:
+            return None
+        return {**(in_flight or {}), **(pending or {})}
+
+    def token(self, profile_id: str) -> Optional[str]:
+        """Version of overlay(profile_id), None when nothing is queued"""
+        return self._tokens.get(str(profile_id))
+
+    def landed(self, profile_id: str, token: str) -> Optional[str]:
+        """updated_at of the row once the overlay version `token` was flushed"""
+        return self._landed.get(f"{profile_id}|{token}")
+
+    def discard(self, profile_id: str):
+        """Drop a pending patch (profile deleted)"""
+        self._pending.pop(str(profile_id), None)
+        self._tokens.pop(str(profile_id), None)
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.window)
+        try:
+            await self.flush()
+        except Exception:
+            logger.exception("Write-behind flush failed, retrying next window")
+            self._timer = asyncio.create_task(self._flush_later())
+
+    async def flush(self):
+        """Send everything pending now, batch_size ids per call"""
+        async with self._lock:
+            while self._pending:
+                ids = list(self._pending)[:self.batch_size]
+                batch = {profile_id: self._pending.pop(profile_id) for profile_id in ids}
+                self._in_flight = batch
+                self._in_flight_tokens = {profile_id: self._tokens.get(profile_id) for profile_id in ids}
+                try:
+                    await self._send(batch)
+                finally:
+                    for profile_id in ids:
+                        self._settle(profile_id, self._in_flight_tokens[profile_id])
+                    self._in_flight = {}
+                    self._in_flight_tokens = {}
+                self.batches += 1
+
+    async def _send(self, batch: dict):
+        """flush_fn over a batch, isolating rows the database rejects"""
+        try:
+            rows = await self.flush_fn(batch)
+        except UpstreamUnavailableError:
+            self.failures += 1
+            self._requeue(batch)
+            raise
+        except PartialFlushError as error:
+            self._landed_rows(error.rows)
+            self._drop({
+                profile_id: exc for profile_id, exc in error.errors.items()
+                if not isinstance(exc, UpstreamUnavailableError)
+            })
+            retry = {
+                profile_id: batch[profile_id] for profile_id, exc in error.errors.items()
+                if isinstance(exc, UpstreamUnavailableError)
+            }
+            if retry:
+                self.failures += 1
+                self._requeue(retry)
+                raise error.errors[next(iter(retry))]
+            return
+        except DatabaseError as error:
+            if len(batch) == 1:
+                self._drop({profile_id: error for profile_id in batch})
+                return
+            # Rejected as a whole (one RPC) - split until the bad rows are alone
+            ids = list(batch)
+            halves = [ids[:len(ids) // 2], ids[len(ids) // 2:]]
+            for index, half in enumerate(halves):
+                try:
+                    await self._send({profile_id: batch[profile_id] for profile_id in half})
+                except UpstreamUnavailableError:
+                    for rest in halves[index + 1:]:
+                        self._requeue({profile_id: batch[profile_id] for profile_id in rest})
+                    raise
+            return
+        self._landed_rows(rows)
+
+    def _requeue(self, batch: dict):
+        """Put patches back under anything newer queued for the same ids"""
+        for profile_id, patch in batch.items():
+            self._pending[profile_id] = {**patch, **self._pending.get(profile_id, {})}
+
+    def _landed_rows(self, rows: list):
+        self.flushed_rows += len(rows)
+        for row in rows:
+            profile_id = str(row["id"])
+            token = self._in_flight_tokens.get(profile_id)
+            if token is not None:
+                self._landed.set(f"{profile_id}|{token}", row.get("updated_at"))
+
+    def _drop(self, errors: dict):
+        """Rejected by the database - retrying will not help"""
+        for profile_id, error in errors.items():
+            self.failures += 1
+            self.dropped += 1
+            logger.error("Write-behind patch for %s dropped: %s", profile_id, error)
+
+    def _settle(self, profile_id: str, token: Optional[str]):
+        """Forget the id's token unless a newer patch is queued behind it"""
+        if profile_id not in self._pending and self._tokens.get(profile_id) == token:
+            self._tokens.pop(profile_id, None)
+
+    async def close(self):
+        """Flush what is left, then stop the timer (shutdown)
+
+        Flushing first waits out a timer flush already in progress instead
+        of cancelling it mid-batch.
+        """
+        try:
+            await self.flush()
+        finally:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self._pending),
+            "in_flight": len(self._in_flight),
+            "submitted": self.submitted,
+            "batches": self.batches,
+            "flushed_rows": self.flushed_rows,
+            "failures": self.failures,
+            "dropped": self.dropped
+        }
@@ -0,0 +1,34 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Hashable
+
+
+class SingleFlight:
+    """Identical concurrent calls share one in-flight upstream request
+
+    The shared call runs as its own task, so a caller that disconnects
+    does not cancel it for everyone else. Results are shared objects -
+    callers must not mutate them.
+    """
+
+    def __init__(self):
+        self._calls: dict = {}
+        self.issued = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._calls.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.issued += 1
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda _: self._calls.pop(key, None))
+        return await asyncio.shield(task)
+
+    def stats(self) -> dict:
+        return {
+            "issued": self.issued,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._calls)
+        }
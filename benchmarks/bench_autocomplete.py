@@ -0,0 +1,87 @@
+"""Autocomplete index memory and query latency on synthetic profiles
+
+    python -m benchmarks.bench_autocomplete --profiles 1000000
+    python -m benchmarks.bench_autocomplete --profiles 200000 --batch-budget-ms 500   # exit 1 if over
+
+"batch_ms" is one update_many() of --batch new profiles plus removals -
+what a bulk import batch or a change feed batch holds the event loop for.
+"""
+import argparse
+import gc
+import random
+import sys
+import time
+import tracemalloc
+import uuid
+from app.services.autocomplete import AutocompleteIndex
+
+FIRST = ["rahul", "priya", "amit", "sneha", "vikram", "anjali", "rohan", "neha", "arjun", "kavya"]
+LAST = ["sharma", "verma", "gupta", "singh", "patel", "reddy", "iyer", "das", "mehta", "nair"]
+
+
+def synthetic_profiles(count: int):
+    for i in range(count):
+        first, last = FIRST[i % 10], LAST[(i // 10) % 10]
+        yield {
+            "id": str(uuid.UUID(int=random.getrandbits(128))),
+            "full_name": f"{first.title()} {last.title()} {i}",
+            "email": f"{first}.{last}{i}@example.com",
+            "role": "institution" if i % 20 == 0 else "user"
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--profiles", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=20_000)
+    parser.add_argument("--batch", type=int, default=500, help="Rows per update_many() batch")
+    parser.add_argument("--batch-budget-ms", type=float, default=None, help="Fail if one batch takes longer")
+    args = parser.parse_args()
+    random.seed(42)
+
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    index = AutocompleteIndex()
+    index.build(synthetic_profiles(args.profiles))
+    build_seconds = time.perf_counter() - started
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    prefixes = ["ra", "priya", "amit sh", "sneha.v", "vik", "neha 12", "arjun nair", "ka", "iyer", "rohan.patel1"]
+    started = time.perf_counter()
+    for i in range(args.queries):
+        index.search(prefixes[i % len(prefixes)], limit=10, role="user" if i % 3 == 0 else None)
+    query_us = (time.perf_counter() - started) / args.queries * 1e6
+
+    started = time.perf_counter()
+    for profile in synthetic_profiles(1000):
+        index.add(profile)
+    add_us = (time.perf_counter() - started) / 1000 * 1e6
+
+    batch = list(synthetic_profiles(args.batch))
+    removed = [row["id"] for row in batch[:args.batch // 5]]
+    started = time.perf_counter()
+    index.update_many(batch)
+    index.update_many((), removed)
+    batch_ms = (time.perf_counter() - started) * 1000
+
+    print({
+        "profiles": args.profiles,
+        "tokens": index.stats()["tokens"],
+        "memory_mb": round(current / 1e6, 1),
+        "bytes_per_profile": round(current / args.profiles),
+        "build_s": round(build_seconds, 2),
+        "query_us": round(query_us, 1),
+        "add_us": round(add_us, 1),
+        "batch_ms": round(batch_ms, 1)
+    })
+
+    if args.batch_budget_ms is not None and batch_ms > args.batch_budget_ms:
+        print(f"batch of {args.batch} took {batch_ms:.1f} ms, over the {args.batch_budget_ms} ms budget", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
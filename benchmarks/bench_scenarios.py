@@ -0,0 +1,198 @@
+"""Load scenarios against the full app + an in-process fake PostgREST
+
+No network and no Supabase project: the API runs in-process behind
+httpx's ASGI transport and talks to benchmarks/fake_postgrest.py, which
+adds `--latency` per upstream call (a typical Supabase round trip is
+5-30 ms). Settings come from the environment / .env as usual, so every
+toggle (PROFILE_CACHE_ENABLED, FAST_JSON, WRITE_BEHIND_ENABLED, ...) can
+be compared run against run:
+
+    python -m benchmarks.bench_scenarios --rows 20000 --requests 500 --concurrency 16
+    python -m benchmarks.bench_scenarios --scenarios crud,search --latency 0.02
+    python -m benchmarks.bench_scenarios --scenarios etags --no-trigger
+
+Per scenario: p50 / p95 / p99 latency, throughput and upstream calls
+(total, per request, and the busiest endpoints). The fake filters in
+Python (a keyset page scans from the top), so compare runs with each
+other rather than with production numbers.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import time
+import uuid
+
+os.environ.setdefault("SUPABASE_URL", "http://fake-postgrest")
+os.environ.setdefault("SUPABASE_KEY", "benchmark")
+
+import httpx
+from app.database import get_async_db_client
+from app.main import create_app
+from benchmarks.fake_postgrest import FakePostgREST
+
+API = "/api/v1/profiles"
+TERMS = ["rahul", "priya sharma", "amit", "sneha", "vikram singh", "neha", "kavya nair", "example.com"]
+
+
+def percentile(samples: list, pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+# ============ SCENARIOS ============
+class Scenarios:
+    """One method per scenario; each call is one API request"""
+
+    def __init__(self, client: httpx.AsyncClient, fake: FakePostgREST, rng: random.Random):
+        self.client = client
+        self.fake = fake
+        self.rng = rng
+        self.ids = list(fake.rows)
+        self.cursors: list = []
+        self.pages = 1
+
+    async def check(self, response: httpx.Response):
+        if response.status_code >= 400:
+            raise RuntimeError(f"{response.request.method} {response.request.url} -> {response.status_code}: {response.text[:200]}")
+
+    async def prepare(self, name: str):
+        """Untimed setup: cursor chain for deep keyset pages"""
+        if name in ("cursor_pages", "offset_pages"):
+            self.pages = max(1, len(self.fake.rows) // 20)
+        if name == "cursor_pages" and not self.cursors:
+            cursor = ""
+            while cursor is not None and len(self.cursors) < 2000:
+                self.cursors.append(cursor)
+                response = await self.client.get(f"{API}/", params={"cursor": cursor, "limit": 20})
+                cursor = response.json()["next_cursor"]
+
+    async def crud(self):
+        """60% get, 15% list, 15% update, 10% create"""
+        roll = self.rng.random()
+        if roll < 0.60:
+            response = await self.client.get(f"{API}/{self.rng.choice(self.ids)}")
+        elif roll < 0.75:
+            response = await self.client.get(f"{API}/", params={"page": self.rng.randint(1, 5), "limit": 20})
+        elif roll < 0.90:
+            response = await self.client.put(
+                f"{API}/{self.rng.choice(self.ids)}",
+                json={"bio": f"draft {self.rng.random()}", "is_active": self.rng.random() < 0.8}
+            )
+        else:
+            response = await self.client.post(f"{API}/", json={
+                "full_name": "Load Test",
+                "email": f"load-{uuid.uuid4().hex[:12]}@example.com"
+            })
+            if response.status_code < 400:
+                self.ids.append(response.json()["data"]["id"])
+        await self.check(response)
+
+    async def etags(self):
+        """GET, PUT, GET one profile - the ETag must move with the write"""
+        profile_id = self.ids.pop()
+        url = f"{API}/{profile_id}"
+        before = await self.client.get(url)
+        await self.check(before)
+        await self.check(await self.client.put(url, json={"bio": f"draft {self.rng.random()}"}))
+        after = await self.client.get(url, headers={"If-None-Match": before.headers["etag"]})
+        await self.check(after)
+        if after.status_code == 304 or after.headers["etag"] == before.headers["etag"]:
+            raise RuntimeError(f"PUT {url} left the ETag at {before.headers['etag']}")
+
+    async def offset_pages(self):
+        """Random deep page, LIMIT / OFFSET style"""
+        page = self.rng.randint(1, self.pages)
+        await self.check(await self.client.get(f"{API}/", params={"page": page, "limit": 20}))
+
+    async def cursor_pages(self):
+        """Random deep page, keyset style"""
+        cursor = self.rng.choice(self.cursors)
+        await self.check(await self.client.get(f"{API}/", params={"cursor": cursor, "limit": 20}))
+
+    async def search(self):
+        await self.check(await self.client.get(f"{API}/search/", params={"q": self.rng.choice(TERMS)}))
+
+    async def stats(self):
+        await self.check(await self.client.get(f"{API}/stats/roles"))
+
+    async def bulk(self):
+        """One 500-row NDJSON import"""
+        batch = uuid.uuid4().hex[:8]
+        body = "\n".join(
+            json.dumps({"full_name": f"Bulk User {i}", "email": f"bulk-{batch}-{i}@example.com"})
+            for i in range(500)
+        )
+        response = await self.client.post(
+            f"{API}/bulk", content=body, headers={"content-type": "application/x-ndjson"}
+        )
+        await self.check(response)
+
+
+SCENARIOS = ["crud", "offset_pages", "cursor_pages", "search", "stats", "bulk", "etags"]
+
+
+async def run(scenarios: Scenarios, name: str, requests: int, concurrency: int) -> dict:
+    await scenarios.prepare(name)
+    operation = getattr(scenarios, name)
+    if name == "bulk":
+        requests = max(1, requests // 50)
+
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one():
+        async with semaphore:
+            started = time.perf_counter()
+            await operation()
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    scenarios.fake.reset_calls()
+    started = time.perf_counter()
+    await asyncio.gather(*[one() for _ in range(requests)])
+    elapsed = time.perf_counter() - started
+    calls = scenarios.fake.calls
+
+    return {
+        "scenario": name,
+        "requests": requests,
+        "p50_ms": round(statistics.median(latencies), 2),
+        "p95_ms": round(percentile(latencies, 0.95), 2),
+        "p99_ms": round(percentile(latencies, 0.99), 2),
+        "rps": round(requests / elapsed, 1),
+        "upstream_calls": sum(calls.values()),
+        "upstream_per_request": round(sum(calls.values()) / requests, 2),
+        "top_calls": dict(calls.most_common(3))
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--rows", type=int, default=20000, help="Seeded profiles")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--latency", type=float, default=0.01, help="Seconds per upstream call")
+    parser.add_argument("--jitter", type=float, default=0.005)
+    parser.add_argument(
+        "--no-trigger", action="store_true", help="Fake without the touch_updated_at trigger (sql/profile_changes.sql)"
+    )
+    args = parser.parse_args()
+
+    fake = FakePostgREST(latency=args.latency, jitter=args.jitter, touch_updated_at=not args.no_trigger)
+    fake.seed(args.rows)
+    get_async_db_client().use_transport(httpx.ASGITransport(app=fake))
+
+    app = create_app()
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+            scenarios = Scenarios(client, fake, random.Random(42))
+            for name in args.scenarios.split(","):
+                print(await run(scenarios, name, args.requests, args.concurrency))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,72 @@
+"""Search latency per mode (ilike vs fts) against the configured Supabase
+
+Seed a scratch project first (sql/seed_synthetic_profiles.sql, 1M rows) and
+install sql/search_profiles.sql, then:
+
+    python -m benchmarks.bench_search --queries 200 --concurrency 8
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from app.database import async_db_client
+from app.services.profile_service import ProfileService
+
+TERMS = [
+    "rahul", "priya sharma", "amit", "sneha ve", "vikram singh", "anjali",
+    "rohan patel", "neha", "arjun", "kavya nair", "synthetic12", "example.com"
+]
+
+
+def percentile(samples: list, pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+async def run_mode(service: ProfileService, mode: str, queries: int, concurrency: int, limit: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(term: str):
+        async with semaphore:
+            started = time.perf_counter()
+            await service.search_profiles(term, limit, mode=mode)
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*[one(random.choice(TERMS)) for _ in range(queries)])
+    elapsed = time.perf_counter() - started
+
+    return {
+        "mode": mode,
+        "queries": queries,
+        "p50_ms": round(statistics.median(latencies), 2),
+        "p95_ms": round(percentile(latencies, 0.95), 2),
+        "p99_ms": round(percentile(latencies, 0.99), 2),
+        "qps": round(queries / elapsed, 1)
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--modes", default="ilike,fts")
+    args = parser.parse_args()
+
+    random.seed(42)
+    service = ProfileService()
+    async_db_client.open()
+    try:
+        for mode in args.modes.split(","):
+            # Warm-up (connections, plan cache)
+            await service.search_profiles(TERMS[0], args.limit, mode=mode)
+            print(await run_mode(service, mode, args.queries, args.concurrency, args.limit))
+    finally:
+        await async_db_client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
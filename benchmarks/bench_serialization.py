@@ -0,0 +1,105 @@
+"""Per-request CPU for list responses: response_model path vs fast_json
+
+Runs an in-process FastAPI app (no network, no database) whose routes
+return the same 10 / 100 PostgREST-shaped rows, through httpx's ASGI
+transport:
+
+    python -m benchmarks.bench_serialization --requests 2000
+
+Modes: "model" (default path - FastAPI validates and re-serializes the
+APIResponse), "fast" (settings.fast_json with orjson if installed) and
+"fast-pydantic" (fast_json forced onto pydantic-core's serializer).
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+import uuid
+
+os.environ.setdefault("SUPABASE_URL", "http://localhost")
+os.environ.setdefault("SUPABASE_KEY", "benchmark")
+
+import httpx
+from fastapi import FastAPI
+from app import serialization
+from app.config import get_settings
+from app.models import APIResponse
+from app.serialization import respond
+
+
+def make_rows(count: int) -> list:
+    """Rows as json.loads() hands them back from PostgREST"""
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "full_name": f"Synthetic User {i}",
+            "email": f"synthetic{i}@example.com",
+            "phone": "9876543210",
+            "bio": "Software developer who likes long benchmark runs. " * 3,
+            "avatar_url": f"https://example.com/avatars/{i}.jpg",
+            "date_of_birth": "1995-05-15",
+            "gender": "Female",
+            "address": "123, MG Road",
+            "city": "Mumbai",
+            "country": "India",
+            "role": "user",
+            "is_active": True,
+            "created_at": "2026-01-01T10:00:00.123456+00:00",
+            "updated_at": "2026-01-02T10:00:00.123456+00:00"
+        }
+        for i in range(count)
+    ]
+
+
+def build_app(pages: dict) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/rows/{size}", response_model=APIResponse)
+    async def rows(size: int):
+        return respond(APIResponse(success=True, message=f"Found {size} profiles", data=pages[size]))
+
+    return app
+
+
+async def measure(client: httpx.AsyncClient, size: int, requests: int) -> dict:
+    cpu = []
+    for _ in range(requests):
+        started = time.process_time()
+        response = await client.get(f"/rows/{size}")
+        cpu.append((time.process_time() - started) * 1e6)
+        assert response.status_code == 200
+    return {
+        "rows": size,
+        "cpu_us_mean": round(statistics.fmean(cpu), 1),
+        "cpu_us_p50": round(statistics.median(cpu), 1),
+        "bytes": len(response.content)
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--sizes", default="10,100")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    pages = {size: make_rows(size) for size in sizes}
+    settings = get_settings()
+    orjson = serialization.orjson
+    transport = httpx.ASGITransport(app=build_app(pages))
+
+    modes = [("model", False, orjson), ("fast", True, orjson), ("fast-pydantic", True, None)]
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for mode, fast_json, backend in modes:
+            settings.fast_json = fast_json
+            serialization.orjson = backend
+            for size in sizes:
+                await measure(client, size, 50)  # warm-up
+                print({"mode": mode, **await measure(client, size, args.requests)})
+
+    serialization.orjson = orjson
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
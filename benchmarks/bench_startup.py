@@ -0,0 +1,111 @@
+"""Cold start: import, create_app(), lifespan startup and first request
+
+Each run is a fresh interpreter (what a worker boot or a scale-from-zero
+instance pays), so nothing is warm in sys.modules:
+
+    python -m benchmarks.bench_startup --runs 5
+    python -m benchmarks.bench_startup --budget-ms 1500   # exit 1 if over
+
+Phases are timed inside the child; "ttfr" is wall time from spawning
+the process to the first response, interpreter start included. The app
+is served through httpx's ASGI transport (no socket) and the first
+request goes to --path, /health by default (no upstream call).
+
+Exit status is 1 when the median ttfr exceeds --budget-ms, or when an
+optional module (bulk parsing, autocomplete, change feed, write-behind)
+was imported although its setting is off, so CI can keep boot time from
+creeping back up.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+CHILD = """
+import time
+started = time.perf_counter()
+import asyncio, json, sys
+import httpx
+from app.main import create_app
+imported = time.perf_counter()
+app = create_app()
+created = time.perf_counter()
+
+async def first_request():
+    async with app.router.lifespan_context(app):
+        ready = time.perf_counter()
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://startup") as client:
+            response = await client.get(sys.argv[1])
+        return ready, response.status_code
+
+ready, status = asyncio.run(first_request())
+done = time.perf_counter()
+
+# Optional modules -> setting that needs them at startup (None: never)
+from app.config import get_settings
+settings = get_settings()
+LAZY = {
+    "app.services.bulk": None,
+    "app.services.autocomplete": "autocomplete_enabled",
+    "app.services.changefeed": "change_feed_enabled",
+    "app.services.write_behind": "write_behind_enabled"
+}
+print(json.dumps({
+    "eager": [
+        name for name, setting in LAZY.items()
+        if name in sys.modules and not (setting and getattr(settings, setting))
+    ],
+    "import_ms": (imported - started) * 1000,
+    "create_app_ms": (created - imported) * 1000,
+    "startup_ms": (ready - created) * 1000,
+    "first_request_ms": (done - ready) * 1000,
+    "status": status
+}))
+"""
+
+
+def run_once(path: str) -> dict:
+    env = dict(os.environ)
+    env.setdefault("SUPABASE_URL", "http://localhost")
+    env.setdefault("SUPABASE_KEY", "benchmark")
+    spawned = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD, path],
+        env=env, capture_output=True, text=True, check=True
+    ).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    # Process exit is after the response; the gap is interpreter teardown only
+    result["ttfr_ms"] = (time.perf_counter() - spawned) * 1000
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--path", default="/health", help="First request path")
+    parser.add_argument("--budget-ms", type=float, default=None, help="Fail if median ttfr is above this")
+    args = parser.parse_args()
+
+    runs = [run_once(args.path) for _ in range(args.runs)]
+    summary = {
+        key: round(statistics.median(run[key] for run in runs), 1)
+        for key in ("import_ms", "create_app_ms", "startup_ms", "first_request_ms", "ttfr_ms")
+    }
+    summary["status"] = runs[-1]["status"]
+    summary["eager"] = sorted({name for run in runs for name in run["eager"]})
+    print(json.dumps(summary))
+
+    if summary["eager"]:
+        print(f"imported at startup although disabled: {', '.join(summary['eager'])}", file=sys.stderr)
+        sys.exit(1)
+    if args.budget_ms is not None and summary["ttfr_ms"] > args.budget_ms:
+        print(f"ttfr {summary['ttfr_ms']} ms is over the {args.budget_ms} ms budget", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""Validations per second for write payloads: previous path vs current
+
+    python -m benchmarks.bench_validation --seconds 1
+
+Per case, "before" reproduces the old code (email regex given as a
+string on every call, model_dump() then hand conversion of
+date_of_birth / role, bulk rows validated one model at a time) and
+"after" is what the service runs now (compiled pattern, one
+model_dump(mode="json"), shared TypeAdapters for bulk chunks).
+"""
+import argparse
+import json
+import re
+import time
+from pydantic import ValidationError, field_validator
+from app.models import PROFILE_CREATE_LIST, ProfileCreate, ProfileUpdate
+from app.services.bulk import validate_chunk
+
+CREATE = {
+    "full_name": "Rahul Sharma",
+    "email": "Rahul.Sharma@Example.com",
+    "phone": "9876543210",
+    "bio": "Software Developer",
+    "date_of_birth": "1995-05-15",
+    "city": "Mumbai",
+    "country": "India",
+    "role": "institution"
+}
+UPDATE = {"bio": "Senior Software Developer", "date_of_birth": "1995-05-16", "role": "user", "is_active": True}
+
+
+# ============ PREVIOUS PATH ============
+class LegacyProfileCreate(ProfileCreate):
+    @field_validator('email')
+    @classmethod
+    def validate_email(cls, v):
+        email_regex = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
+        if not re.match(email_regex, v):
+            raise ValueError('Invalid email format')
+        return v.lower()
+
+
+def legacy_row(model) -> dict:
+    data = model.model_dump(exclude_none=True)
+    if 'date_of_birth' in data and data['date_of_birth']:
+        data['date_of_birth'] = str(data['date_of_birth'])
+    if 'role' in data:
+        data['role'] = data['role'].value if hasattr(data['role'], 'value') else data['role']
+    return data
+
+
+def legacy_chunk(rows: list) -> list:
+    payload = []
+    for row in rows:
+        try:
+            payload.append(legacy_row(LegacyProfileCreate.model_validate(row)))
+        except ValidationError:
+            pass
+    return payload
+
+
+# ============ CASES ============
+def bulk_rows(count: int, bad_every: int = 0) -> list:
+    rows = []
+    for i in range(count):
+        row = {**CREATE, "email": f"user{i}@example.com"}
+        if bad_every and i % bad_every == 0:
+            row["email"] = "not-an-email"
+        rows.append(row)
+    return rows
+
+
+def current_chunk(rows: list) -> list:
+    valid, _ = validate_chunk(rows, 0)
+    return PROFILE_CREATE_LIST.dump_python([profile for _, profile in valid], mode="json", exclude_none=True)
+
+
+def measure(fn, seconds: float) -> float:
+    """Calls per second"""
+    calls = 0
+    started = time.perf_counter()
+    deadline = started + seconds
+    while time.perf_counter() < deadline:
+        for _ in range(50):
+            fn()
+        calls += 50
+    return calls / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=1.0, help="Per measurement")
+    parser.add_argument("--chunk", type=int, default=500, help="Rows per bulk chunk")
+    args = parser.parse_args()
+
+    clean = bulk_rows(args.chunk)
+    dirty = bulk_rows(args.chunk, bad_every=50)
+    # Same payloads either way
+    assert legacy_row(LegacyProfileCreate.model_validate(CREATE)) == ProfileCreate.model_validate(CREATE).to_row()
+    assert legacy_chunk(clean) == current_chunk(clean)
+    assert legacy_chunk(dirty) == current_chunk(dirty)
+
+    cases = {
+        "create": (
+            lambda: legacy_row(LegacyProfileCreate.model_validate(CREATE)),
+            lambda: ProfileCreate.model_validate(CREATE).to_row(),
+            1
+        ),
+        "update": (
+            lambda: legacy_row(ProfileUpdate.model_validate(UPDATE)),
+            lambda: ProfileUpdate.model_validate(UPDATE).to_row(),
+            1
+        ),
+        "bulk_chunk": (lambda: legacy_chunk(clean), lambda: current_chunk(clean), args.chunk),
+        "bulk_chunk_2pct_bad": (lambda: legacy_chunk(dirty), lambda: current_chunk(dirty), args.chunk)
+    }
+    for name, (before, after, rows) in cases.items():
+        before_rate = measure(before, args.seconds) * rows
+        after_rate = measure(after, args.seconds) * rows
+        print(json.dumps({
+            "case": name,
+            "before_rows_per_s": round(before_rate),
+            "after_rows_per_s": round(after_rate),
+            "before_us_per_row": round(1e6 / before_rate, 2),
+            "after_us_per_row": round(1e6 / after_rate, 2),
+            "speedup": round(after_rate / before_rate, 2)
+        }))
+
+
+if __name__ == "__main__":
+    main()
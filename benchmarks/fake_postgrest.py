@@ -0,0 +1,458 @@
+"""In-process stand-in for Supabase's PostgREST (profiles table)
+
+An ASGI app implementing the subset of PostgREST that app/database.py
+relies on, so the API can be exercised without a network:
+
+    fake = FakePostgREST(latency=0.005)
+    fake.seed(10_000)
+    client = AsyncSupabaseClient(transport=httpx.ASGITransport(app=fake))
+
+Supported: select=, eq / neq / gt / gte / lt / lte / in / is / like /
+ilike (and not.<op>), or= / and= trees, order=, limit / offset, Range,
+Prefer count / return / resolution / missing, content-range, on_conflict
+and columns= for inserts, PATCH / DELETE with filters, and the RPCs from
+sql/ (profile_stats, search_profiles, apply_profile_patches). Unique
+email is enforced (409 / 23505). Deletes leave tombstones readable at
+/rest/v1/profile_deletions, like sql/profile_changes.sql. Every request
+sleeps `latency` (+ up to `jitter`) seconds and is counted in `calls`.
+touch_updated_at=False drops the touch_updated_at trigger: PATCH and
+upserts keep whatever updated_at the payload carries.
+"""
+import asyncio
+import json
+import random
+import re
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Optional
+from starlette.requests import Request
+from starlette.responses import Response
+
+COLUMNS = (
+    "id", "full_name", "email", "phone", "bio", "avatar_url", "date_of_birth", "gender",
+    "address", "city", "country", "role", "is_active", "created_at", "updated_at"
+)
+DEFAULTS = {"role": "user", "is_active": True}
+PATCHABLE = (
+    "full_name", "phone", "bio", "avatar_url", "date_of_birth", "gender",
+    "address", "city", "country", "is_active", "role"
+)
+CITIES = ["Mumbai", "Delhi", "Bengaluru", "Pune", "Chennai", "Kolkata", "Jaipur", None]
+FIRST_NAMES = ["Rahul", "Priya", "Amit", "Sneha", "Vikram", "Anjali", "Rohan", "Neha", "Arjun", "Kavya"]
+LAST_NAMES = ["Sharma", "Verma", "Singh", "Patel", "Nair", "Gupta", "Iyer", "Khan"]
+
+
+def now() -> str:
+    """Timestamps in PostgREST's fixed-width format (string order = time order)"""
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%f+00:00")
+
+
+def error(status_code: int, message: str, code: Optional[str] = None, details: Optional[str] = None) -> Response:
+    body = {"code": code, "message": message, "details": details, "hint": None}
+    return Response(json.dumps(body), status_code=status_code, media_type="application/json")
+
+
+# ============ FILTER PARSING ============
+def split_top(text: str) -> list:
+    """Split on commas outside parentheses and double quotes"""
+    parts, depth, quoted, start, i = [], 0, False, 0, 0
+    while i < len(text):
+        char = text[i]
+        if quoted:
+            if char == "\\":
+                i += 1
+            elif char == '"':
+                quoted = False
+        elif char == '"':
+            quoted = True
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "," and depth == 0:
+            parts.append(text[start:i])
+            start = i + 1
+        i += 1
+    parts.append(text[start:])
+    return [part for part in parts if part]
+
+
+def unquote(value: str) -> str:
+    if len(value) >= 2 and value[0] == value[-1] == '"':
+        return re.sub(r"\\(.)", r"\1", value[1:-1])
+    return value
+
+
+def like_regex(pattern: str) -> re.Pattern:
+    """LIKE pattern ('*' or '%', '_', backslash escapes) -> compiled regex"""
+    out, i = [], 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == "\\" and i + 1 < len(pattern):
+            out.append(re.escape(pattern[i + 1]))
+            i += 1
+        elif char in "%*":
+            out.append(".*")
+        elif char == "_":
+            out.append(".")
+        else:
+            out.append(re.escape(char))
+        i += 1
+    return re.compile("".join(out), re.S)
+
+
+def as_text(value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return str(value)
+
+
+def compile_condition(column: str, expression: str):
+    """'eq.x' / 'not.ilike.*x*' / 'in.(a,b)' -> predicate(row)"""
+    negate = expression.startswith("not.")
+    if negate:
+        expression = expression[4:]
+    op, _, raw = expression.partition(".")
+
+    if op in ("or", "and"):
+        predicate = compile_tree(op, raw)
+    elif op == "in":
+        values = {unquote(item) for item in split_top(raw.strip()[1:-1])}
+        predicate = lambda row: as_text(row.get(column)) in values
+    elif op == "is":
+        expected = {"null": None, "true": "true", "false": "false"}[raw.lower()]
+        predicate = lambda row: as_text(row.get(column)) == expected
+    elif op in ("like", "ilike"):
+        regex = like_regex(unquote(raw))
+        flags = re.I if op == "ilike" else 0
+        regex = re.compile(regex.pattern, regex.flags | flags)
+        predicate = lambda row: row.get(column) is not None and regex.fullmatch(str(row[column])) is not None
+    elif op in ("eq", "neq", "gt", "gte", "lt", "lte"):
+        value = unquote(raw)
+        compare = {
+            "eq": lambda a, b: a == b, "neq": lambda a, b: a != b,
+            "gt": lambda a, b: a > b, "gte": lambda a, b: a >= b,
+            "lt": lambda a, b: a < b, "lte": lambda a, b: a <= b
+        }[op]
+
+        def predicate(row):
+            current = row.get(column)
+            if current is None:
+                return False
+            target = value.lower() if isinstance(current, bool) else value
+            return compare(as_text(current), target)
+    else:
+        raise ValueError(f"Unsupported operator: {op}")
+
+    return (lambda row: not predicate(row)) if negate else predicate
+
+
+def compile_tree(kind: str, body: str):
+    """'(a.eq.1,or(b.eq.2,c.eq.3))' -> predicate(row)"""
+    body = body.strip()
+    if not (body.startswith("(") and body.endswith(")")):
+        raise ValueError(f"Logic tree needs parentheses: {body}")
+    predicates = []
+    for item in split_top(body[1:-1]):
+        negate = item.startswith("not.")
+        inner = item[4:] if negate else item
+        match = re.match(r"^(or|and)(\(.*\))$", inner, re.S)
+        if match:
+            predicate = compile_tree(match.group(1), match.group(2))
+        else:
+            column, _, expression = inner.partition(".")
+            predicate = compile_condition(column, expression)
+        predicates.append((lambda p: lambda row: not p(row))(predicate) if negate else predicate)
+    combine = any if kind == "or" else all
+    return lambda row: combine(predicate(row) for predicate in predicates)
+
+
+RESERVED_PARAMS = {"select", "order", "limit", "offset", "on_conflict", "columns"}
+
+
+def compile_filters(params) -> list:
+    predicates = []
+    for key, value in params.multi_items():
+        if key in RESERVED_PARAMS:
+            continue
+        if key in ("or", "and", "not.or", "not.and"):
+            negate = key.startswith("not.")
+            predicate = compile_tree(key.split(".")[-1], value)
+            predicates.append((lambda p: lambda row: not p(row))(predicate) if negate else predicate)
+        else:
+            predicates.append(compile_condition(key, value))
+    return predicates
+
+
+def sort_rows(rows: list, order: Optional[str]) -> list:
+    if not order:
+        return rows
+    for part in reversed(order.split(",")):
+        column, *modifiers = part.split(".")
+        descending = "desc" in modifiers
+        present = [row for row in rows if row.get(column) is not None]
+        missing = [row for row in rows if row.get(column) is None]
+        present.sort(key=lambda row: as_text(row[column]), reverse=descending)
+        # Postgres default: NULLS LAST for asc, NULLS FIRST for desc
+        rows = missing + present if descending else present + missing
+    return rows
+
+
+def parse_prefer(header: Optional[str]) -> dict:
+    prefer = {}
+    for part in (header or "").split(","):
+        key, _, value = part.strip().partition("=")
+        if key:
+            prefer[key] = value
+    return prefer
+
+
+# ============ APP ============
+class FakePostgREST:
+    """ASGI app: /rest/v1/profiles and /rest/v1/rpc/<function>"""
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, seed: int = 42, touch_updated_at: bool = True):
+        self.latency = latency
+        self.jitter = jitter
+        self.touch_updated_at = touch_updated_at
+        self.rows: dict = {}
+        # profile_deletions tombstones by id
+        self.deletions: dict = {}
+        self.calls: Counter = Counter()
+        self.random = random.Random(seed)
+        # order= -> sorted rows, dropped on every write
+        self._sorted: dict = {}
+
+    # ---------- data ----------
+    def make_row(self, data: dict) -> dict:
+        stamp = now()
+        row = {column: None for column in COLUMNS}
+        row.update(DEFAULTS)
+        row.update({"id": str(uuid.uuid4()), "created_at": stamp, "updated_at": stamp})
+        row.update(data)
+        return row
+
+    def seed(self, count: int, prefix: str = "synthetic") -> list:
+        """Add `count` synthetic profiles; returns their ids"""
+        ids = []
+        for i in range(count):
+            first = self.random.choice(FIRST_NAMES)
+            last = self.random.choice(LAST_NAMES)
+            row = self.make_row({
+                "full_name": f"{first} {last}",
+                "email": f"{prefix}{len(self.rows)}.{first.lower()}@example.com",
+                "bio": f"{first} works on things. " * 4,
+                "city": self.random.choice(CITIES),
+                "country": "India",
+                "role": "institution" if i % 10 == 0 else "user",
+                "is_active": i % 7 != 0
+            })
+            self.rows[row["id"]] = row
+            ids.append(row["id"])
+        self._sorted.clear()
+        return ids
+
+    def reset_calls(self):
+        self.calls.clear()
+
+    # ---------- ASGI ----------
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return
+        request = Request(scope, receive)
+        delay = self.latency + (self.random.uniform(0, self.jitter) if self.jitter else 0.0)
+        if delay:
+            await asyncio.sleep(delay)
+        try:
+            response = await self.handle(request)
+        except (ValueError, KeyError) as e:
+            response = error(400, f"Bad request: {e}", "PGRST100")
+        await response(scope, receive, send)
+
+    async def handle(self, request: Request) -> Response:
+        path = request.url.path.removeprefix("/rest/v1/")
+        self.calls[f"{request.method} {path}"] += 1
+        body = await request.body()
+        payload = json.loads(body) if body else None
+
+        if path.startswith("rpc/"):
+            return self.rpc(path[4:], payload or {})
+        if path == "profile_deletions" and request.method == "GET":
+            return self.select_deletions(request)
+        if path != "profiles":
+            return error(404, f'relation "public.{path}" does not exist', "42P01")
+
+        prefer = parse_prefer(request.headers.get("prefer"))
+        if request.method == "GET":
+            return self.select(request, prefer)
+        if request.method == "POST":
+            return self.insert(request, payload, prefer)
+        if request.method == "PATCH":
+            return self.update(request, payload, prefer)
+        if request.method == "DELETE":
+            return self.delete(request, prefer)
+        return error(405, "Method not allowed")
+
+    def matching(self, request: Request, order: Optional[str] = None, stop: Optional[int] = None) -> list:
+        """Filtered rows in order; stop = enough rows (no count needed)"""
+        predicates = compile_filters(request.query_params)
+        if order not in self._sorted:
+            self._sorted[order] = sort_rows(list(self.rows.values()), order)
+        rows = []
+        for row in self._sorted[order]:
+            if all(predicate(row) for predicate in predicates):
+                rows.append(row)
+                if stop is not None and len(rows) >= stop:
+                    break
+        return rows
+
+    @staticmethod
+    def project(rows: list, select: Optional[str]) -> list:
+        if not select or select == "*":
+            return rows
+        columns = [column.strip() for column in select.split(",")]
+        return [{column: row.get(column) for column in columns} for row in rows]
+
+    @staticmethod
+    def respond(rows: list, prefer: dict, status_code: int = 200) -> Response:
+        if prefer.get("return") == "representation":
+            return Response(json.dumps(rows), status_code=status_code, media_type="application/json")
+        return Response(status_code=204 if status_code == 200 else status_code)
+
+    def select(self, request: Request, prefer: dict) -> Response:
+        params = request.query_params
+        offset = int(params.get("offset", 0))
+        limit = int(params["limit"]) if "limit" in params else None
+        range_header = request.headers.get("range")
+        if range_header:
+            start, _, end = range_header.partition("-")
+            offset = int(start)
+            limit = int(end) - offset + 1 if end else None
+
+        counting = prefer.get("count") in ("exact", "planned", "estimated")
+        stop = offset + limit if limit is not None and not counting else None
+        rows = self.matching(request, params.get("order"), stop)
+        page = rows[offset:offset + limit if limit is not None else None]
+
+        counted = str(len(rows)) if counting else "*"
+        content_range = f"{offset}-{offset + len(page) - 1}/{counted}" if page else f"*/{counted}"
+        return Response(
+            json.dumps(self.project(page, params.get("select"))),
+            media_type="application/json",
+            headers={"content-range": content_range}
+        )
+
+    def select_deletions(self, request: Request) -> Response:
+        params = request.query_params
+        predicates = compile_filters(params)
+        rows = [row for row in self.deletions.values() if all(predicate(row) for predicate in predicates)]
+        rows = sort_rows(rows, params.get("order"))
+        if "limit" in params:
+            rows = rows[:int(params["limit"])]
+        return Response(json.dumps(self.project(rows, params.get("select"))), media_type="application/json")
+
+    def insert(self, request: Request, payload: Any, prefer: dict) -> Response:
+        items = payload if isinstance(payload, list) else [payload]
+        columns = request.query_params.get("columns")
+        if columns:
+            allowed = set(columns.split(","))
+            items = [{key: value for key, value in item.items() if key in allowed} for item in items]
+
+        resolution = prefer.get("resolution")
+        by_email = {row["email"]: row for row in self.rows.values()}
+        created, staged = [], {}
+        for item in items:
+            existing = by_email.get(item.get("email")) or staged.get(item.get("email"))
+            if existing is not None:
+                if resolution == "ignore-duplicates":
+                    continue
+                if resolution == "merge-duplicates":
+                    existing.update(item)
+                    if self.touch_updated_at:
+                        existing["updated_at"] = now()
+                    created.append(existing)
+                    continue
+                return error(
+                    409,
+                    'duplicate key value violates unique constraint "profiles_email_key"',
+                    "23505",
+                    f"Key (email)=({item.get('email')}) already exists."
+                )
+            if not item.get("full_name") or not item.get("email"):
+                return error(400, 'null value in column violates not-null constraint', "23502")
+            row = self.make_row(item)
+            staged[row["email"]] = row
+            created.append(row)
+
+        for row in staged.values():
+            self.rows[row["id"]] = row
+        self._sorted.clear()
+        return self.respond(created, prefer, status_code=201)
+
+    def update(self, request: Request, payload: dict, prefer: dict) -> Response:
+        rows = self.matching(request)
+        if "email" in payload and any(
+            row["email"] == payload["email"] and row not in rows for row in self.rows.values()
+        ):
+            return error(409, 'duplicate key value violates unique constraint "profiles_email_key"', "23505")
+        for row in rows:
+            row.update(payload)
+            if self.touch_updated_at:
+                row["updated_at"] = now()
+        self._sorted.clear()
+        return self.respond(rows, prefer)
+
+    def delete(self, request: Request, prefer: dict) -> Response:
+        rows = self.matching(request)
+        for row in rows:
+            del self.rows[row["id"]]
+            self.deletions[row["id"]] = {"id": row["id"], "deleted_at": now(), "old_row": row}
+        self._sorted.clear()
+        return self.respond(rows, prefer)
+
+    # ---------- RPC ----------
+    def rpc(self, function: str, params: dict) -> Response:
+        handler = getattr(self, f"rpc_{function}", None)
+        if handler is None:
+            return error(404, f"Could not find the function public.{function}", "PGRST202")
+        return Response(json.dumps(handler(**params)), media_type="application/json")
+
+    def rpc_profile_stats(self) -> list:
+        groups = Counter(
+            (row["role"], row["is_active"], row["city"], row["country"]) for row in self.rows.values()
+        )
+        return [
+            {"role": role, "is_active": is_active, "city": city, "country": country, "total": total}
+            for (role, is_active, city, country), total in groups.items()
+        ]
+
+    def rpc_search_profiles(self, q: str, role_filter=None, max_rows=20, after_rank=None, after_id=None) -> list:
+        words = re.findall(r"\w+", q.lower())
+        hits = []
+        for row in self.rows.values():
+            if role_filter is not None and row["role"] != role_filter:
+                continue
+            text = f"{row['full_name']} {row['email']}".lower()
+            if not words or not all(word in text for word in words):
+                continue
+            rank = round(sum(text.count(word) for word in words) / (1 + len(text) / 100), 6)
+            if after_rank is not None and (rank, row["id"]) >= (after_rank, after_id):
+                continue
+            hits.append((rank, row["id"], row))
+        hits.sort(key=lambda hit: (hit[0], hit[1]), reverse=True)
+        return [{"profile": row, "rank": rank} for rank, _, row in hits[:max_rows]]
+
+    def rpc_apply_profile_patches(self, patches: list) -> list:
+        updated = []
+        for item in patches:
+            row = self.rows.get(item["id"])
+            if row is None:
+                continue
+            row.update({key: value for key, value in item["patch"].items() if key in PATCHABLE})
+            row["updated_at"] = now()
+            updated.append(row)
+        self._sorted.clear()
+        return updated
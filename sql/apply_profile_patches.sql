@@ -0,0 +1,30 @@
+-- Batched partial updates for the write-behind buffer (settings.write_behind_enabled)
+-- Called through PostgREST as POST /rest/v1/rpc/apply_profile_patches with
+--   {"patches": [{"id": "<uuid>", "patch": {"bio": "...", "is_active": false}}, ...]}
+-- Only the keys present in each patch are written; one statement per batch.
+
+create or replace function public.apply_profile_patches(patches jsonb)
+returns setof public.profiles
+language sql
+as $$
+    update public.profiles p
+    set
+        full_name     = case when x.patch ? 'full_name'     then r.full_name     else p.full_name end,
+        phone         = case when x.patch ? 'phone'         then r.phone         else p.phone end,
+        bio           = case when x.patch ? 'bio'           then r.bio           else p.bio end,
+        avatar_url    = case when x.patch ? 'avatar_url'    then r.avatar_url    else p.avatar_url end,
+        date_of_birth = case when x.patch ? 'date_of_birth' then r.date_of_birth else p.date_of_birth end,
+        gender        = case when x.patch ? 'gender'        then r.gender        else p.gender end,
+        address       = case when x.patch ? 'address'       then r.address       else p.address end,
+        city          = case when x.patch ? 'city'          then r.city          else p.city end,
+        country       = case when x.patch ? 'country'       then r.country       else p.country end,
+        is_active     = case when x.patch ? 'is_active'     then r.is_active     else p.is_active end,
+        role          = case when x.patch ? 'role'          then r.role          else p.role end,
+        updated_at    = now()
+    from jsonb_to_recordset(patches) as x(id uuid, patch jsonb)
+    cross join lateral jsonb_populate_record(null::public.profiles, x.patch) as r
+    where p.id = x.id
+    returning p.*;
+$$;
+
+grant execute on function public.apply_profile_patches(jsonb) to anon, authenticated;
@@ -0,0 +1,56 @@
+-- Change feed support (settings.change_feed_enabled)
+-- The polling source reads GET /rest/v1/profiles?updated_at=gt.<watermark>
+-- ordered by (updated_at, id), and deletes from profile_deletions
+-- (set change_feed_deletions_table=profile_deletions).
+
+-- Every write must move updated_at, or the feed never sees it
+create or replace function public.touch_updated_at()
+returns trigger
+language plpgsql
+as $$
+begin
+    new.updated_at := now();
+    return new;
+end;
+$$;
+
+drop trigger if exists profiles_touch_updated_at on public.profiles;
+create trigger profiles_touch_updated_at
+    before update on public.profiles
+    for each row execute function public.touch_updated_at();
+
+-- Keyset scans after the watermark
+create index if not exists profiles_updated_at_id_idx
+    on public.profiles (updated_at, id);
+
+-- Tombstones: deleted rows leave nothing for updated_at polling to find
+create table if not exists public.profile_deletions (
+    id          uuid primary key,
+    deleted_at  timestamptz not null default now(),
+    old_row     jsonb not null
+);
+
+create index if not exists profile_deletions_deleted_at_id_idx
+    on public.profile_deletions (deleted_at, id);
+
+create or replace function public.record_profile_deletion()
+returns trigger
+language plpgsql
+as $$
+begin
+    insert into public.profile_deletions (id, old_row)
+    values (old.id, to_jsonb(old))
+    on conflict (id) do update set deleted_at = now(), old_row = excluded.old_row;
+    return old;
+end;
+$$;
+
+drop trigger if exists profiles_record_deletion on public.profiles;
+create trigger profiles_record_deletion
+    after delete on public.profiles
+    for each row execute function public.record_profile_deletion();
+
+grant select on public.profile_deletions to anon, authenticated;
+
+-- Tombstones are only needed until every worker has read past them, e.g.
+--   delete from public.profile_deletions where deleted_at < now() - interval '7 days';
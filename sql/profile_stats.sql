@@ -0,0 +1,14 @@
+-- Grouped profile counts for /profiles/stats/roles (one round trip)
+-- Called through PostgREST as POST /rest/v1/rpc/profile_stats
+
+create or replace function public.profile_stats()
+returns table (role text, is_active boolean, city text, country text, total bigint)
+language sql
+stable
+as $$
+    select p.role::text, p.is_active, p.city, p.country, count(*) as total
+    from public.profiles p
+    group by p.role, p.is_active, p.city, p.country;
+$$;
+
+grant execute on function public.profile_stats() to anon, authenticated;
@@ -0,0 +1,55 @@
+-- Indexed, ranked profile search for /profiles/search/
+--   * pg_trgm GIN indexes: ILIKE '%term%' (search_mode=ilike) stops seq-scanning
+--   * expression GIN index + search_profiles(): ranked full-text search (search_mode=fts)
+--     (an expression index, not a column, so select=* payloads do not grow)
+
+create extension if not exists pg_trgm;
+
+create index if not exists profiles_full_name_trgm_idx
+    on public.profiles using gin (full_name gin_trgm_ops);
+create index if not exists profiles_email_trgm_idx
+    on public.profiles using gin (email gin_trgm_ops);
+
+create or replace function public.profile_search_vector(full_name text, email text)
+returns tsvector
+language sql
+immutable
+as $$
+    select to_tsvector('simple', coalesce(full_name, '') || ' ' || coalesce(email, ''));
+$$;
+
+create index if not exists profiles_search_vector_idx
+    on public.profiles using gin (public.profile_search_vector(full_name, email));
+
+-- Every word of q is a prefix match; rows ranked by ts_rank, then id.
+-- Continue a page with the (rank, id) of its last row.
+create or replace function public.search_profiles(
+    q text,
+    role_filter text default null,
+    max_rows int default 10,
+    after_rank real default null,
+    after_id uuid default null
+)
+returns table (profile jsonb, rank real)
+language sql
+stable
+as $$
+    with query as (
+        select to_tsquery('simple', string_agg(quote_literal(word) || ':*', ' & ')) as tsq
+        from unnest(regexp_split_to_array(lower(trim(q)), '\s+')) as word
+        where word <> ''
+    ),
+    ranked as (
+        select p, ts_rank(public.profile_search_vector(p.full_name, p.email), query.tsq) as rank
+        from public.profiles p, query
+        where public.profile_search_vector(p.full_name, p.email) @@ query.tsq
+          and (role_filter is null or p.role::text = role_filter)
+    )
+    select to_jsonb(ranked.p), ranked.rank
+    from ranked
+    where after_rank is null or (ranked.rank, (ranked.p).id) < (after_rank, after_id)
+    order by ranked.rank desc, (ranked.p).id desc
+    limit max_rows;
+$$;
+
+grant execute on function public.search_profiles(text, text, int, real, uuid) to anon, authenticated;
@@ -0,0 +1,22 @@
+-- Synthetic dataset for benchmarks (default 1M rows). Run on a scratch project only.
+--   psql "$DATABASE_URL" -v rows=1000000 -f sql/seed_synthetic_profiles.sql
+
+\if :{?rows}
+\else
+    \set rows 1000000
+\endif
+
+insert into public.profiles (full_name, email, city, country, role, is_active)
+select
+    (array['Rahul','Priya','Amit','Sneha','Vikram','Anjali','Rohan','Neha','Arjun','Kavya'])[1 + i % 10]
+        || ' ' ||
+    (array['Sharma','Verma','Gupta','Singh','Patel','Reddy','Iyer','Das','Mehta','Nair'])[1 + (i / 10) % 10]
+        || ' ' || i,
+    'synthetic' || i || '@example.com',
+    (array['Mumbai','Delhi','Pune','Chennai','Kolkata','Jaipur'])[1 + i % 6],
+    'India',
+    case when i % 20 = 0 then 'institution' else 'user' end,
+    i % 13 <> 0
+from generate_series(1, :rows) as i;
+
+analyze public.profiles;